@@ -1,28 +1,173 @@
 import argparse
-from source.CP import cp_model
-from source.SAT import sat_model
-from source.MIP import mip_model
-from source.SMT import smt_model
+import importlib
+import multiprocessing
+import os
+import queue
+import signal
+import time
 
+# Modules are imported on demand: each backend pulls in its own solver bindings
+# (MiniZinc, Z3, AMPL with its license activation) that other runs do not need
+MODEL_MODULES = {
+    "cp": "source.CP.cp_model",
+    "sat": "source.SAT.sat_model",
+    "smt": "source.SMT.smt_model",
+    "mip": "source.MIP.mip_model"
+}
 
-def run_all_models(selected_model=None):
-    models = {
-        "cp": cp_model,
-        "sat": sat_model,
-        "smt": smt_model,
-        "mip": mip_model
-    }
+# Models raced by --model auto. SMT is left out: it runs on Z3 like the SAT model,
+# which was faster on most instances of the results in res/
+RACE_MODELS = ["cp", "sat", "mip"]
+
+# Seconds a terminated race worker gets to exit before it is killed
+RACE_GRACE_PERIOD = 5
+
+
+def load_model(model_name):
+    """
+    Imports the driver module of the given model.
+    """
 
+    return importlib.import_module(MODEL_MODULES[model_name])
+
+
+def run_all_models(selected_model=None):
     if selected_model:
-        if selected_model in models:
+        if selected_model in MODEL_MODULES:
             print(f"Running all configurations for model: {selected_model}")
-            models[selected_model].run_all()
+            load_model(selected_model).run_all()
         else:
             print(f"Model '{selected_model}' not implemented.")
     else:
-        for model_name, model in models.items():
+        for model_name in MODEL_MODULES:
             print(f"Running all configurations for model: {model_name}")
-            model.run_all()
+            load_model(model_name).run_all()
+
+
+def run_single_model(model_name, args, solver=None, save=True):
+    """
+    Runs a single configuration of the given model.
+
+    Params:
+        model_name: One of "cp", "sat", "smt", "mip"
+        args: Parsed command line arguments
+        solver: The solver to use (None for the model default)
+        save: Whether to write the results to the model's results file
+    Returns:
+        results_dict: Dictionary with the results of the configuration
+    """
+
+    if model_name == "cp":
+        return load_model("cp").run_single_instance(
+            n=args.teams,
+            solver=solver,
+            use_sb=args.sb,
+            heuristic=args.hf,
+            use_optimization=args.opt,
+            save=save
+        )
+    elif model_name == "sat":
+        return load_model("sat").run_single_instance(
+            n=args.teams,
+            solver=solver,
+            use_sb=args.sb,
+            use_optimization=args.opt,
+            save=save
+        )
+    elif model_name == "mip":
+        return load_model("mip").run_single_instance(
+            n=args.teams,
+            solver=solver,
+            use_sb=args.sb,
+            use_optimization=args.opt,
+            save=save
+        )
+    elif model_name == "smt":
+        return load_model("smt").run_single_instance(
+            n=args.teams,
+            solver=solver,
+            use_sb=args.sb,
+            use_optimization=args.opt,
+            save=save
+        )
+    else:
+        print(f"Model error")
+
+
+def race_worker(model_name, args, results_queue):
+    """
+    Runs a single configuration of a model and reports its results on the queue.
+    The worker leads its own process group, so that external solver processes
+    it spawns are terminated together with it. It writes no results file:
+    a worker may be killed at any time, so only the parent saves the winner's results.
+    """
+
+    os.setpgrp()
+
+    try:
+        results_dict = run_single_model(model_name, args, save=False)
+    except Exception as e:
+        print(f"Error in model {model_name}: {e}")
+        results_dict = {}
+
+    results_queue.put((model_name, results_dict))
+
+
+def race_models(args, timeout=300):
+    """
+    Runs the same configuration on the CP, SAT and MIP models concurrently and keeps
+    the first one that finds a solution, terminating the others.
+    Only the winner's results are printed and written to its model's results file.
+
+    Params:
+        args: Parsed command line arguments
+        timeout: Maximum time to wait for a solution (in seconds)
+    Returns:
+        (winner, results_dict): The winning model and its results, or (None, {}) if none found a solution
+    """
+
+    results_queue = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=race_worker, args=(model_name, args, results_queue))
+        for model_name in RACE_MODELS
+    ]
+
+    for p in procs:
+        p.start()
+
+    # One deadline for the whole race, whatever the number of results without a solution
+    deadline = time.monotonic() + timeout
+    winner, winner_results = None, {}
+    try:
+        for _ in procs:
+            model_name, results_dict = results_queue.get(timeout=max(0, deadline - time.monotonic()))
+            if any(entry["sol"] for entry in results_dict.values()):
+                winner, winner_results = model_name, results_dict
+                break
+    except queue.Empty:
+        pass
+    finally:
+        for p in procs:
+            try:
+                os.killpg(p.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                # The worker has not made its process group yet
+                p.terminate()
+            p.join(RACE_GRACE_PERIOD)
+            if p.is_alive():
+                p.kill()
+                p.join()
+
+    if winner:
+        print(f"First solution found by model: {winner}")
+        module = load_model(winner)
+        for entry in winner_results.values():
+            module.utils.print_solution(entry["time"], entry["optimal"], entry["sol"], entry["obj"])
+        module.save_results(args.teams, winner_results)
+    else:
+        print("No model found a solution.")
+
+    return winner, winner_results
 
 
 def main():
@@ -33,14 +178,16 @@ def main():
     mode.add_argument("--single", action="store_true", help="Run a single configuration")
     parser.add_argument("--teams", type=int, default=6, help="Number of teams (for --single)")
     parser.add_argument("--sb", action="store_true", help="Enable symmetry breaking")
-    parser.add_argument("--hf", type=int, choices=[1, 2, 3, 4], default=1,
+    parser.add_argument("--hf", type=int, choices=[1, 2, 3, 4, 5], default=1,
                         help="Search strategy to use: "
-                             "1=default, 2=dom/wdeg, 3=dom/wdeg+luby, 4=dom/wdeg+luby+LNS")
+                             "1=default, 2=dom/wdeg, 3=dom/wdeg+luby, 4=dom/wdeg+luby+LNS, "
+                             "5=dom/wdeg+luby(500)+LNS(95%%)")
     parser.add_argument("--opt", action="store_true", help="Enable optimization")
-    parser.add_argument("--solver", type=str, choices=["gecode", "chuffed", "gurobi", "cplex", "z3", "glucose"],
-                        help="Solver to use (CP: gecode, chuffed | MIP: gurobi, cplex | SAT: z3, glucose | SMT: z3)")
-    parser.add_argument("--model", type=str, choices=["cp", "sat", "smt", "mip"],
-                        help="Which model to run")
+    parser.add_argument("--solver", type=str, choices=["gecode", "chuffed", "gurobi", "cplex", "z3", "glucose", "cadical", "kissat",
+                                                        "treengeling", "portfolio"],
+                        help="Solver to use (CP: gecode, chuffed | MIP: gurobi, cplex | SAT: z3, glucose, cadical, kissat, treengeling, portfolio | SMT: z3)")
+    parser.add_argument("--model", type=str, choices=["cp", "sat", "smt", "mip", "auto"],
+                        help="Which model to run (auto = race all models, keep the first solution)")
 
     args = parser.parse_args()
 
@@ -48,37 +195,10 @@ def main():
         run_all_models(selected_model=args.model)
 
     elif args.single:
-        if args.model == "cp":
-            cp_model.run_single_instance(
-                n=args.teams,
-                solver=args.solver,
-                use_sb=args.sb,
-                use_heuristics=args.hf,
-                use_optimization=args.opt
-            )
-        elif args.model == "sat":
-            sat_model.run_single_instance(
-                n=args.teams,
-                solver=args.solver,
-                use_sb=args.sb,
-                use_optimization=args.opt
-            )
-        elif args.model == "mip":
-            mip_model.run_single_instance(
-                n=args.teams,
-                solver=args.solver,
-                use_sb=args.sb,
-                use_optimization=args.opt
-            )
-        elif args.model == "smt":
-            smt_model.run_single_instance(
-                n=args.teams,
-                solver=args.solver,
-                use_sb=args.sb,
-                use_optimization=args.opt
-            )
+        if args.model == "auto":
+            race_models(args)
         else:
-            print(f"Model error")
+            run_single_model(args.model, args, solver=args.solver)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,47 @@
 from minizinc import Model
 
 
-def build_model(path, use_sb=False, heuristic=1, use_optimization=False):
+# dom/wdeg search over opponents, home/away places and periods
+SEQ_SEARCH = """
+        :: seq_search([
+            int_search([O[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min),
+            int_search([PL[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min),
+            int_search([per[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min)
+        ])"""
+
+RESTARTS = """
+        :: restart_luby({luby_scale})"""
+
+LNS = """
+        :: relax_and_reconstruct(
+            [O[t,w] | t in TEAMS, w in WEEKS] ++
+            [PL[t,w] | t in TEAMS, w in WEEKS] ++
+            [per[t,w] | t in TEAMS, w in WEEKS], {lns_pct})"""
+
+# Solve item prefix for each search strategy
+SEARCHES = {
+    1: "solve",
+    2: "solve" + SEQ_SEARCH,
+    3: "solve" + SEQ_SEARCH + RESTARTS,
+    4: "solve" + SEQ_SEARCH + RESTARTS + LNS,
+    5: "solve" + SEQ_SEARCH + RESTARTS + LNS,
+}
+
+# Default (Luby scale, % of variables kept fixed by LNS) for each search strategy
+SEARCH_PARAMS = {
+    3: (250, None),
+    4: (250, 85),
+    5: (500, 95),
+}
+
+# Solve item goal, depending on whether optimization is used
+GOALS = {
+    True: " minimize max_imbalance;",
+    False: " satisfy;",
+}
+
+
+def build_model(path, use_sb=False, heuristic=1, use_optimization=False, luby_scale=None, lns_pct=None):
     """
     Builds dynamically a MiniZinc model from the given path with specified options.
 
@@ -13,71 +53,27 @@ def build_model(path, use_sb=False, heuristic=1, use_optimization=False):
             2 -> dom/wdeg + random value
             3 -> dom/wdeg + random value + restarts (Luby L=250)
             4 -> dom/wdeg + random value + restarts + LNS (85% fixed)
+            5 -> dom/wdeg + random value + restarts (Luby L=500) + LNS (95% fixed)
         use_optimization: Boolean indicating if optimization is used.
+        luby_scale: Scale of the Luby restarts, overriding the heuristic default (optional).
+        lns_pct: Percentage of variables kept fixed by LNS, overriding the heuristic default (optional).
     Returns:
         A tuple containing:
             - model: A MiniZinc Model object.
             - extra_params: A dictionary with additional parameters for the instance.
     """
 
-    model = Model()
-    model.add_file(path)
+    if heuristic not in SEARCHES:
+        raise ValueError("Unknown heuristic index (must be 1-5).")
 
-    # Objective function
-    if use_optimization:
-        solve_prefix = "solve minimize max_imbalance;"
-    else:
-        solve_prefix = "solve satisfy;"
+    default_luby_scale, default_lns_pct = SEARCH_PARAMS.get(heuristic, (None, None))
+    search = SEARCHES[heuristic].format(
+        luby_scale=luby_scale if luby_scale is not None else default_luby_scale,
+        lns_pct=lns_pct if lns_pct is not None else default_lns_pct,
+    )
 
-    # Default (heuristic = 1)
-    if heuristic == 1:
-        model.add_string(solve_prefix)
-
-    # Heuristic 2: dom/wdeg + random value
-    elif heuristic == 2:
-        search = """
-        solve :: seq_search([
-            int_search([O[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min),
-            int_search([PL[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min),
-            int_search([per[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min)
-        ])
-        """
-        model.add_string(search + (" minimize max_imbalance;" if use_optimization else " satisfy;"))
-
-    # Heuristic 3: dom/wdeg + random value + restarts (Luby L=250)
-    elif heuristic == 3:
-        search = """
-        solve 
-        :: seq_search([
-            int_search([O[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min),
-            int_search([PL[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min),
-            int_search([per[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min)
-        ])
-        :: restart_luby(250)
-        """
-        model.add_string(search + (" minimize max_imbalance;" if use_optimization else " satisfy;"))
-
-    # Heuristic 4: dom/wdeg + random value + restarts + LNS (85% fixed)
-    elif heuristic == 4:
-        search = """
-        solve 
-        :: seq_search([
-            int_search([O[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min),
-            int_search([PL[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min),
-            int_search([per[t,w] | t in TEAMS, w in WEEKS], dom_w_deg, indomain_min)
-        ])
-        :: restart_luby(250)
-        :: relax_and_reconstruct(
-            [O[t,w] | t in TEAMS, w in WEEKS] ++
-            [PL[t,w] | t in TEAMS, w in WEEKS] ++
-            [per[t,w] | t in TEAMS, w in WEEKS], 85)
-        """
-        model.add_string(search + (" minimize max_imbalance;" if use_optimization else " satisfy;"))
-
-    else:
-        raise ValueError("Unknown heuristic index (must be 1-4).")
+    model = Model()
+    model.add_file(str(path))
+    model.add_string(search + GOALS[bool(use_optimization)])
 
     return model, {"sb": use_sb, "heuristic": heuristic, "opt": use_optimization}
-
-
-
@@ -2,57 +2,112 @@ from source.CP.instance_solver import solve_instance
 from source.CP.build_model import build_model
 from minizinc import Solver
 from source.CP import cp_utils as utils
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
+from multiprocessing import Manager
+from pathlib import Path
+import copy
 import os
-import os.path as pt
 
-current_dir = os.getcwd()
+ROOT_DIR = Path(__file__).resolve().parents[2]
 
-DEFAULT_CP_MODEL_FILE = pt.join(current_dir, 'source/CP/model/cp_model.mzn')
-DEFAULT_CP_OUTPUT_DIR = pt.join(current_dir, 'res/CP')
+DEFAULT_CP_MODEL_FILE = ROOT_DIR / 'source/CP/model/cp_model.mzn'
+DEFAULT_CP_OUTPUT_DIR = ROOT_DIR / 'res/CP'
 
+# Number of configurations solved concurrently by run_all (1 = sequential sweep)
+MAX_WORKERS = int(os.getenv("CDMO_WORKERS", os.cpu_count() or 1))
 
-def cp_solver(n_instances, solver, use_sb=False, hf=False, use_optimization=False):
+# Whether concurrent optimization runs share the best objective found for each n as an upper bound.
+# The bound makes a run's time and optimality depend on its siblings: CP_SHARE_BOUNDS=0 turns it off
+SHARE_BOUNDS = os.getenv("CP_SHARE_BOUNDS", "1") != "0"
+
+
+@lru_cache(maxsize=None)
+def cached_lookup(solver):
+    """
+    Resolves a MiniZinc solver by name, once per process.
+    """
+
+    return Solver.lookup(solver)
+
+
+@lru_cache(maxsize=None)
+def cached_build(path, use_sb, heuristic, use_optimization):
+    """
+    Builds the MiniZinc model for a configuration, once per process.
+    Instances copy the model they are created from, so the cached model is never modified
+    and keeps the output type analysed by the first instance.
+    """
+
+    return build_model(path, use_sb, heuristic, use_optimization)
+
+
+def cp_solver(n_instances, solver, use_sb=False, hf=1, use_optimization=False, bound=None, processes=None,
+              on_solution=None):
     """
     Solves the CP model using the specified solver and parameters.
     Params:
         n_instances: Number of instances to solve
         solver: The solver to use (e.g., "gecode")
         use_sb: Whether to use symmetry breaking
-        hf: Heuristic function to use (1-4)
+        hf: Heuristic function to use (1-5)
         use_optimization: Whether to use optimization techniques
+        bound: Best objective value already known for the instance, used as upper bound (optional)
+        processes: Number of threads the solver can use, if it supports it (optional)
+        on_solution: Callback receiving the objective of every intermediate solution (optional)
     Returns:
         result: The result of the solver
     """
 
-    solver_instance = Solver.lookup(solver)
+    solver_instance = cached_lookup(solver)
     path = DEFAULT_CP_MODEL_FILE
 
-    model, extra_params = build_model(path, use_sb, hf, use_optimization)
+    model, extra_params = cached_build(path, use_sb, hf, use_optimization)
+
+    # The optimum is never worse than a known incumbent, so this only prunes the search
+    if use_optimization and bound is not None:
+        bounded_model = copy.copy(model)
+        bounded_model.output_type = model.output_type
+        bounded_model.add_string(f"constraint max_imbalance <= {bound};")
+        model = bounded_model
+
+    if processes is not None and "-p" not in solver_instance.stdFlags:
+        processes = None
 
-    result = solve_instance(n_instances, solver_instance, model, extra_params)
+    result = solve_instance(n_instances, solver_instance, model, dict(extra_params), processes, on_solution)
     return result
 
 
-def run_model(results_dict, n, solver, sb, hf, opt):
+def run_model_task(n, solver, sb, hf, opt, best_obj=None, lock=None, processes=None):
     """
-    Runs the CP model with the given parameters and updates the results dictionary.
-    
+    Runs the CP model with the given parameters and returns its result entry.
+    Being a top-level function returning plain data, it can be submitted to a process pool.
+
     Params:
-        results_dict: Dictionary to store results
         n: Number of teams (instances)
         solver: The solver to use (e.g., "gecode")
         sb: Whether to use symmetry breaking
-        hf: Whether to use heuristics
+        hf: Heuristic function to use (1-5)
         opt: Whether to use optimization techniques
+        best_obj: Shared dictionary with the best objective found so far for each n (optional)
+        lock: Lock guarding best_obj updates (required with best_obj)
+        processes: Number of threads the solver can use (optional)
+    Returns:
+        A tuple (key, entry) where entry is the results dictionary for the configuration
     """
 
+    # Boolean flags from the former use_heuristics interface: True meant dom/wdeg
+    if isinstance(hf, bool):
+        hf = 2 if hf else 1
+
     key = utils.make_key(solver, sb, hf, opt)
 
     heuristic_map = {
         1: "base",
         2: "dom/wdeg + indomain_min",
         3: "dom/wdeg + indomain_min + luby",
-        4: "dom/wdeg + indomain_min + luby + lns"
+        4: "dom/wdeg + indomain_min + luby + lns",
+        5: "dom/wdeg + indomain_min + luby(500) + lns(95%)"
     }
 
     try:
@@ -65,15 +120,31 @@ def run_model(results_dict, n, solver, sb, hf, opt):
             f"\n  - optimization = {opt}"
         )
 
+        bound = None
+        on_solution = None
+
+        if best_obj is not None:
+            bound = best_obj.get(n)
+
+            # Publish every incumbent as soon as it is found, not only at the end of the run
+            def on_solution(obj):
+                if obj is None:
+                    return
+                with lock:
+                    if obj < best_obj.get(n, obj + 1):
+                        best_obj[n] = obj
+
         result = cp_solver(n_instances=n, solver=solver,
                            use_sb=sb, hf=hf,
-                           use_optimization=opt)
+                           use_optimization=opt,
+                           bound=bound, processes=processes,
+                           on_solution=on_solution)
 
         time, optimal, solution, obj = utils.process_result(result, opt)
 
         utils.print_solution(time, optimal, solution, obj)
 
-        results_dict[key] = {
+        entry = {
             "sol": solution,
             "time": time,
             "optimal": optimal,
@@ -82,17 +153,49 @@ def run_model(results_dict, n, solver, sb, hf, opt):
 
     except Exception as e:
         print(f"Error in {key} for n={n}: {e}")
-        results_dict[key] = {
+        entry = {
             "sol": [],
             "time": 300,
             "optimal": False,
             "obj": None
         }
 
+    return key, entry
+
+
+def run_model(results_dict, n, solver, sb, hf, opt):
+    """
+    Runs the CP model with the given parameters and updates the results dictionary.
+    
+    Params:
+        results_dict: Dictionary to store results
+        n: Number of teams (instances)
+        solver: The solver to use (e.g., "gecode")
+        sb: Whether to use symmetry breaking
+        hf: Heuristic function to use (1-5)
+        opt: Whether to use optimization techniques
+    """
+
+    key, entry = run_model_task(n, solver, sb, hf, opt)
+    results_dict[key] = entry
+
     return results_dict
 
 
-def run_single_instance(n, solver, use_sb=False, use_heuristics=False, use_optimization=False):
+def save_results(n, results_dict):
+    """
+    Writes the results of the given number of teams to the CP results directory.
+
+    Params:
+        n: Number of teams (instances)
+        results_dict: Dictionary with the results of the configurations
+    """
+
+    os.makedirs(DEFAULT_CP_OUTPUT_DIR, exist_ok=True)
+    utils.write_solution(DEFAULT_CP_OUTPUT_DIR, n, results_dict)
+
+
+def run_single_instance(n, solver, use_sb=False, heuristic=1, use_optimization=False, save=True):
     """
     Runs a single instance of the CP model with the given parameters.
 
@@ -100,26 +203,59 @@ def run_single_instance(n, solver, use_sb=False, use_heuristics=False, use_optim
         n: Number of teams (instances)
         solver: The solver to use (e.g., "gecode")
         use_sb: Whether to use symmetry breaking
-        use_heuristics: Whether to use heuristics
+        heuristic: Heuristic function to use (1-5)
         use_optimization: Whether to use optimization techniques
+        save: Whether to write the results to the model's results file
+    Returns:
+        results_dict: Dictionary with the results of the configuration
     """
 
     if solver is None:
         solver = 'gecode'
 
-    output_dir = DEFAULT_CP_OUTPUT_DIR
-    os.makedirs(output_dir, exist_ok=True)
-
     results_dict = {}
 
-    results_dict = run_model(results_dict, n, solver, use_sb, use_heuristics, use_optimization)
+    results_dict = run_model(results_dict, n, solver, use_sb, heuristic, use_optimization)
 
-    utils.write_solution(output_dir, n, results_dict)
+    if save:
+        save_results(n, results_dict)
+
+    return results_dict
+
+
+def skip_model_task(n, solver, sb, hf, opt):
+    """
+    Returns the result entry of a configuration that is not run, recorded as a timeout.
+
+    Params:
+        n: Number of teams (instances)
+        solver: The solver to use (e.g., "gecode")
+        sb: Whether to use symmetry breaking
+        hf: Heuristic function to use (1-5)
+        opt: Whether to use optimization techniques
+    Returns:
+        A tuple (key, entry) where entry is the results dictionary for the configuration
+    """
+
+    key = utils.make_key(solver, sb, hf, opt)
+    print(f"\nSkipping {key} for n={n}: no solution found without optimization")
+
+    return key, {
+        "sol": [],
+        "time": 300,
+        "optimal": False,
+        "obj": None
+    }
 
 
 def run_all():
     """
     Runs all configurations for the CP model.
+    Configurations are solved concurrently on up to MAX_WORKERS processes
+    (set CDMO_WORKERS=1 to run the sweep sequentially), sharing their best objective
+    as an upper bound unless SHARE_BOUNDS is off.
+    The optimization version of a configuration only runs if its satisfaction
+    version found a solution, since it needs a solution to start from.
     """
 
     solvers = ["gecode", "chuffed"]
@@ -127,13 +263,70 @@ def run_all():
     output_dir = DEFAULT_CP_OUTPUT_DIR
     os.makedirs(output_dir, exist_ok=True)
 
-    for n in instances:
-        results_dict = {}
-
-        for solver in solvers:
-            for sb in [False, True]:
-                for hf in [1, 2, 3, 4]:  # Heuristic functions
-                    for opt in [False, True]:
-                        results_dict = run_model(results_dict, n, solver, sb, hf, opt)
-
-        utils.write_solution(output_dir, n, results_dict)
+    configs = [
+        (n, solver, sb, hf, opt)
+        for n in instances
+        for solver in solvers
+        for sb in [False, True]
+        for hf in [1, 2, 3, 4, 5]  # Heuristic functions
+        for opt in [False, True]
+    ]
+
+    if MAX_WORKERS <= 1:
+        for n in instances:
+            results_dict = {}
+            for config in configs:
+                if config[0] != n:
+                    continue
+                _, solver, sb, hf, opt = config
+                if opt and not results_dict[utils.make_key(solver, sb, hf, False)]["sol"]:
+                    key, entry = skip_model_task(*config)
+                    results_dict[key] = entry
+                else:
+                    results_dict = run_model(results_dict, *config)
+            utils.write_solution(output_dir, n, results_dict)
+        return
+
+    entries = {}
+    pending = {n: sum(1 for config in configs if config[0] == n) for n in instances}
+
+    # Threads left to each solver once every worker is busy
+    processes = max(1, (os.cpu_count() or 1) // MAX_WORKERS)
+
+    with Manager() as manager, ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Best objective found so far for each n, shared as upper bound between workers
+        best_obj = manager.dict()
+        lock = manager.Lock()
+
+        def submit(config):
+            if not SHARE_BOUNDS:
+                return executor.submit(run_model_task, *config, processes=processes)
+            return executor.submit(run_model_task, *config, best_obj, lock, processes)
+
+        # Satisfaction runs first, each one unlocks its optimization run
+        futures = {submit(config): config for config in configs if not config[4]}
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+            finished = []
+            for future in done:
+                config = futures.pop(future)
+                entries[config] = future.result()
+                finished.append(config)
+
+                if not config[4]:
+                    opt_config = config[:4] + (True,)
+                    if entries[config][1]["sol"]:
+                        futures[submit(opt_config)] = opt_config
+                    else:
+                        entries[opt_config] = skip_model_task(*opt_config)
+                        finished.append(opt_config)
+
+            for n, *_ in finished:
+                pending[n] -= 1
+
+                # All configurations for n are done: write them in sweep order
+                if pending[n] == 0:
+                    results_dict = dict(entries[c] for c in configs if c[0] == n)
+                    utils.write_solution(output_dir, n, results_dict)
@@ -1,6 +1,5 @@
 import os
 import json
-import math
 from minizinc import Status
 
 
@@ -27,11 +26,8 @@ def print_solution(time, optimal, solution, obj):
     header = ["Period \\ Week"] + [str(w + 1) for w in range(num_weeks)]
     output.append("{:<15}".format(header[0]) + "".join(f"{w:<10}" for w in header[1:]))
 
-    for p in range(num_periods):
-        row = [f"{p + 1:<15}"]
-        for w in range(num_weeks):
-            row.append(f"{str(solution[p][w]):<10}")
-        output.append("".join(row))
+    cell = "{!s:<10}".format
+    output.extend(f"{p + 1:<15}" + "".join(map(cell, row)) for p, row in enumerate(solution))
 
     output.append(f"\nTime taken: {time} seconds")
     output.append(f"Optimal: {'Yes' if optimal else 'No'}")
@@ -59,25 +55,23 @@ def parse_solution(solution):
     # weekly[w][p] = [home, away]
     weekly = [[None for _ in range(periods)] for _ in range(weeks)]
 
-    for w in range(weeks):
-        filled_periods = set()
+    for t, (opponents, places, team_periods) in enumerate(zip(solution.O, solution.PL, solution.per)):
+        team = t + 1
 
-        for t in range(teams):
-            p = solution.per[t][w] - 1
-            if p in filled_periods:
-                continue
+        for w in range(weeks):
+            opp = opponents[w]
 
-            opp = solution.O[t][w]
-            is_home = solution.PL[t][w]
+            # Each match appears in the rows of both teams: place it from the lower index one
+            if opp < team:
+                continue
 
-            if is_home == 1:
-                weekly[w][p] = [t + 1, opp]
+            if places[w] == 1:
+                weekly[w][team_periods[w] - 1] = [team, opp]
             else:
-                weekly[w][p] = [opp, t + 1]
-
-            filled_periods.add(p)
+                weekly[w][team_periods[w] - 1] = [opp, team]
 
-    result = [[weekly[w][p] for w in range(weeks)] for p in range(periods)]
+    # transpose weekly[w][p] into result[p][w]
+    result = [list(col) for col in zip(*weekly)]
     return result
 
 
@@ -88,7 +82,7 @@ def make_key(solver, sb, heuristic, opt):
         solver: The name of the solver.
         sb: Boolean indicating if symmetry breaking is used.
         heuristic: Integer indicating which heuristic is used
-                   (1=base, 2=dom/wdeg, 3=+restarts, 4=+LNS).
+                   (1=base, 2=dom/wdeg, 3=+restarts, 4=+LNS, 5=+LNS 95%).
         opt: Boolean indicating if optimization is used.
     Returns:
         A string key representing the solver configuration.
@@ -98,7 +92,8 @@ def make_key(solver, sb, heuristic, opt):
         1: "base",
         2: "dom",
         3: "luby",
-        4: "lns"
+        4: "lns",
+        5: "lns95"
     }
 
     heuristic_key = heuristic_map.get(heuristic, f"h{heuristic}")
@@ -127,10 +122,14 @@ def process_result(result, use_optimization):
             - obj: The objective value if available, otherwise None.
     """
 
+    # Nothing to parse on timeouts and failures
+    if result.solution is None or not result.status.has_solution():
+        return 300, False, [], None
+
     raw_time = result.statistics.get("time", None)
 
     if raw_time is not None:
-        actual_time = math.floor(raw_time.total_seconds())
+        actual_time = raw_time.days * 86400 + raw_time.seconds
     else:
         actual_time = 300
 
@@ -164,17 +163,17 @@ def write_solution(output_dir, n, results_dict):
         results_dict: A dictionary containing the results to be written.
     """
 
+    out = {
+        key: {
+            "time": val["time"],
+            "optimal": bool(val["optimal"]),
+            "obj": val["obj"],
+            "sol": val["sol"]
+        }
+        for key, val in results_dict.items()
+    }
+
     out_path = os.path.join(output_dir, f"{n}.json")
     with open(out_path, 'w') as f:
-        f.write('{\n')
-        for i, (key, val) in enumerate(results_dict.items()):
-            f.write(f'  "{key}": {{\n')
-
-            sol_str = json.dumps(val["sol"], separators=(',', ':'))
-            f.write(f'    "time": {val["time"]},\n')
-            f.write(f'    "optimal": {"true" if val["optimal"] else "false"},\n')
-            f.write(f'    "obj": {json.dumps(val["obj"])},\n')
-            f.write(f'    "sol": {sol_str}\n')
-
-            f.write('  }' + (',' if i < len(results_dict) - 1 else '') + '\n')
-        f.write('}\n')
+        json.dump(out, f, separators=(',', ':'), default=str)
+        f.write('\n')
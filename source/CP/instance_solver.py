@@ -1,8 +1,9 @@
-from minizinc import Instance
+from minizinc import Instance, Result, Status
+import asyncio
 import datetime
 
 
-def solve_instance(num_teams, solver, model, extra_params):
+def solve_instance(num_teams, solver, model, extra_params, processes=None, on_solution=None):
     """
     Solves a MiniZinc instance with the given parameters.
 
@@ -11,25 +12,49 @@ def solve_instance(num_teams, solver, model, extra_params):
         solver: The name of the solver to use.
         model: The MiniZinc model to solve.
         extra_params: A dictionary of additional parameters for the instance.
+        processes: Number of threads the solver can use (optional).
+        on_solution: Callback receiving the objective of every intermediate solution (optional).
     Returns:
         A MiniZinc result object containing the solution.
     """
-    
-    instance = Instance(solver, model)
 
-    instance["teams"] = num_teams
+    return asyncio.run(
+        solve_instance_async(num_teams, solver, model, extra_params, processes, on_solution)
+    )
 
-    for key, value in extra_params.items():
-        instance[key] = value
 
-    name_parts = [f"{num_teams}"]
-    for key, value in extra_params.items():
-        if value:
-            name_parts.append(str(key))
+async def solve_instance_async(num_teams, solver, model, extra_params, processes=None, on_solution=None):
+    """
+    Solves a MiniZinc instance streaming its intermediate solutions.
+    The stream ends as soon as the solver reports the final status (e.g. optimality).
+
+    Params:
+        See solve_instance.
+    Returns:
+        A MiniZinc result object with the final status, the last solution and all statistics.
+    """
+
+    instance = Instance(solver, model)
 
-    result = instance.solve(
-            timeout=datetime.timedelta(minutes=5),
-            free_search=not extra_params.get("hf", False),
-        )
+    for key, value in {"teams": num_teams, **extra_params}.items():
+        instance[key] = value
 
-    return result
+    status = Status.UNKNOWN
+    solution = None
+    statistics = {}
+
+    async for result in instance.solutions(
+            time_limit=datetime.timedelta(minutes=5),
+            intermediate_solutions=True if extra_params.get("opt", False) else None,
+            free_search=extra_params.get("heuristic", 1) == 1,
+            processes=processes,
+    ):
+        status = result.status
+        statistics.update(result.statistics)
+
+        if result.solution is not None:
+            solution = result.solution
+            if on_solution is not None:
+                on_solution(result.objective)
+
+    return Result(status, solution, statistics)
@@ -1,17 +1,50 @@
 from amplpy import AMPL, modules
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
+import multiprocessing
 import os
 import time
 from source.MIP import mip_utils as utils
 import traceback
 
-modules.activate(os.getenv("AMPL_LICENSE_UUID"))
-
 current_dir = os.getcwd()
 DEFAULT_MIP_OUTPUT_DIR = os.path.join(current_dir, 'res/MIP')
 DEFAULT_MIP_MODEL_FILE = os.path.join(current_dir, 'source/MIP/model/mip_model.mod')
 
+# Number of configurations solved concurrently by run_all (1 = sequential sweep)
+MAX_WORKERS = int(os.getenv("CDMO_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+
+# Number of threads available to the MIP solver (split between workers by run_all)
+MIP_THREADS = int(os.getenv("MIP_THREADS", os.cpu_count() or 1))
+
+
+@lru_cache(maxsize=None)
+def load_model_source(path):
+    """
+    Reads the AMPL model file, once per process.
+    """
+
+    with open(path) as f:
+        return f.read()
+
 
-def mip_solver(n, solver, use_sb=False, use_optimization=False):
+@lru_cache(maxsize=None)
+def cached_ampl():
+    """
+    Starts an AMPL process with the model loaded, once per process.
+    Each configuration resets its data instead of starting (and licensing) a new process.
+    The license is activated here rather than at import, so importing this module stays cheap.
+    """
+
+    modules.activate(os.getenv("AMPL_LICENSE_UUID"))
+    ampl = AMPL()
+    ampl.setOption("solver_msg", 0)
+    ampl.eval(load_model_source(DEFAULT_MIP_MODEL_FILE))
+
+    return ampl
+
+
+def mip_solver(n, solver, use_sb=False, use_optimization=False, threads=None, warm_start=None):
     """
     Solves the MIP model using the specified parameters.
     Params:
@@ -19,45 +52,81 @@ def mip_solver(n, solver, use_sb=False, use_optimization=False):
         solver: The solver to use (e.g., "gurobi", "cplex")
         use_sb: Whether to use symmetry breaking
         use_optimization: Whether to use optimization techniques
+        threads: Maximum number of threads the solver may use (None for MIP_THREADS)
+        warm_start: A schedule feasible for this configuration, passed to the solver as MIP start (optional)
 
     Returns:
-        ampl: The AMPL object after solving the model
+        ampl: The AMPL object after solving the model (valid until the next call)
     """
-    ampl = AMPL()
+    ampl = cached_ampl()
+
+    # Clear parameters and variable values left by the previous configuration
+    ampl.eval("reset data;")
 
-    ampl.setOption("solver_msg", 0)
     ampl.setOption("solver", solver)
 
     time_limit = 300
+    if threads is None:
+        threads = MIP_THREADS
+
     if solver == "gurobi":
-        ampl.setOption("gurobi_options", f"TimeLimit={time_limit}")
+        options = [f"TimeLimit={time_limit}", f"Threads={threads}"]
+        if not use_optimization:
+            # Any feasible schedule will do: favour finding one over proving bounds
+            options.append("MIPFocus=1")
+        if warm_start:
+            options.append("mipstart=1")
+        ampl.setOption("gurobi_options", " ".join(options))
     elif solver == "cplex":
-        ampl.setOption("cplex_options", f"timelimit={time_limit}")
-
-    ampl.read(DEFAULT_MIP_MODEL_FILE)
+        options = [f"timelimit={time_limit}", f"threads={threads}"]
+        if warm_start:
+            options.append("mipstart=1")
+        ampl.setOption("cplex_options", " ".join(options))
 
     ampl.getParameter('n').set(n)
 
     ampl.getParameter('use_sb').set(1 if use_sb else 0)
     ampl.getParameter('use_opt').set(1 if use_optimization else 0)
+    # Release the symmetry-breaking fixings of the previous configuration, if any
+    ampl.eval("unfix y; unfix A; unfix H;")
+
+    if use_sb:
+        # Fix outright what symmetry breaking implies, so presolve drops these variables:
+        # team 1 meets team w+1 in week w (SB2), in the first period and at home in week 1
+        # (periods can be relabelled and home/away swapped everywhere without loss)
+        ampl.eval(
+            "fix {w in WEEKS} y[1, w + 1, w] := 1;"
+            "fix A[1, 2, 1, 1] := 1;"
+            "fix H[1, 2, 1] := 1;"
+        )
+
+    if warm_start:
+        y_start, A_start, H_start = utils.start_values(warm_start)
+        ampl.getVariable('y').setValues(y_start)
+        ampl.getVariable('A').setValues(A_start)
+        ampl.getVariable('H').setValues(H_start)
 
     ampl.solve()
 
     return ampl
 
 
-def run_model(results_dict, n, solver, use_sb=False, use_optimization=False):
+def run_model_task(n, solver, use_sb=False, use_optimization=False, threads=None, warm_start=None):
     """
-    Runs the MIP model with the given parameters and updates the results dictionary.
+    Runs the MIP model with the given parameters.
+    Being a top-level function returning plain data, it can be submitted to a process pool.
 
     Params:
-        results_dict: Dictionary to store results
         n: Number of teams (instances)
         solver: The solver to use (e.g., "gurobi", "cplex")
         use_sb: Whether to use symmetry breaking
         use_optimization: Whether to use optimization techniques
+        threads: Maximum number of threads the solver may use (None for MIP_THREADS)
+        warm_start: A schedule feasible for this configuration, used as MIP start (optional)
     Returns:
-        results_dict: Updated dictionary with results for the given configuration
+        A tuple containing:
+            - key: The key of the configuration
+            - entry: Dictionary with the results of the configuration
     """
 
     key = utils.make_key(solver, use_sb, use_optimization)
@@ -71,114 +140,31 @@ def run_model(results_dict, n, solver, use_sb=False, use_optimization=False):
         )
 
         start = time.time()
-        ampl = mip_solver(n, solver, use_sb, use_optimization)
+        ampl = mip_solver(n, solver, use_sb, use_optimization, threads, warm_start)
         elapsed_time = time.time() - start
 
-        y_var = ampl.getVariable('y')
-        A_var = ampl.getVariable('A')
-        H_var = ampl.getVariable('H')
-
-        y_dict = {}
-        A_dict = {}
-        H_dict = {}
-
-        try:
-            try:
-                y_values = y_var.getValues()
-                df_y = y_values.to_pandas()
-                if not df_y.empty:
-                    val_col = df_y.columns[-1]
-                    idx_cols = df_y.columns[:-1]
-                    for _, row in df_y.iterrows():
-                        indices = tuple(int(row[c]) if str(row[c]).isdigit() else row[c] for c in idx_cols)
-                        val = float(row[val_col])
-                        if val > 0.5:
-                            y_dict[indices] = int(round(val))
-            except Exception:
-                TEAMS = range(1, n + 1)
-                WEEKS = range(1, n)
-                for i in TEAMS:
-                    for k in TEAMS:
-                        if i < k:  # only non-oriented pairs
-                            for w in WEEKS:
-                                try:
-                                    val = float(ampl.getValue(f"y[{i},{k},{w}]"))
-                                    if val > 0.5:
-                                        y_dict[(i, k, w)] = int(round(val))
-                                except Exception:
-                                    pass
-
-            try:
-                A_values = A_var.getValues()
-                df_A = A_values.to_pandas()
-                if not df_A.empty:
-                    val_col = df_A.columns[-1]
-                    idx_cols = df_A.columns[:-1]
-                    for _, row in df_A.iterrows():
-                        indices = tuple(int(row[c]) if str(row[c]).isdigit() else row[c] for c in idx_cols)
-                        val = float(row[val_col])
-                        if val > 0.5:
-                            A_dict[indices] = int(round(val))
-            except Exception:
-                TEAMS = range(1, n + 1)
-                WEEKS = range(1, n)
-                PERIODS = range(1, n // 2 + 1)
-                for i in TEAMS:
-                    for k in TEAMS:
-                        if i < k:  # only non-oriented pairs
-                            for w in WEEKS:
-                                for p in PERIODS:
-                                    try:
-                                        val = float(ampl.getValue(f"A[{i},{k},{w},{p}]"))
-                                        if val > 0.5:
-                                            A_dict[(i, k, w, p)] = int(round(val))
-                                    except Exception:
-                                        pass
-
-            try:
-                H_values = H_var.getValues()
-                df_H = H_values.to_pandas()
-                if not df_H.empty:
-                    val_col = df_H.columns[-1]
-                    idx_cols = df_H.columns[:-1]
-                    for _, row in df_H.iterrows():
-                        indices = tuple(int(row[c]) if str(row[c]).isdigit() else row[c] for c in idx_cols)
-                        val = float(row[val_col])
-                        if val > 0.5:
-                            H_dict[indices] = int(round(val))
-            except Exception:
-                TEAMS = range(1, n + 1)
-                WEEKS = range(1, n)
-                for h in TEAMS:
-                    for a in TEAMS:
-                        if h != a:
-                            for w in WEEKS:
-                                try:
-                                    val = float(ampl.getValue(f"H[{h},{a},{w}]"))
-                                    if val > 0.5:
-                                        H_dict[(h, a, w)] = int(round(val))
-                                except Exception:
-                                    pass
-
-        except Exception:
-            print("Error processing variables, using fallback methods...")
-
-        W, P = n - 1, n // 2
-
-        variables_dict = {
-            'A_dict': A_dict,
-            'H_dict': H_dict,
-            'y_dict': y_dict
-        }
-        solution = utils.parse_solution(ampl, variables_dict, W, P, n)
+        # Infeasible (2xx), unbounded (3xx) and failed (5xx) solves leave no incumbent to read back
+        solve_result_num = ampl.get_value("solve_result_num")
+        if solve_result_num < 200 or 400 <= solve_result_num < 500:
+            W, P = n - 1, n // 2
+
+            # Any failure reading the variables is reported by the handler below
+            variables_dict = {
+                'A_dict': utils.get_active_values(ampl, 'A'),
+                'H_dict': utils.get_active_values(ampl, 'H'),
+                'y_dict': utils.get_active_values(ampl, 'y')
+            }
+            solution, complete = utils.parse_solution(ampl, variables_dict, W, P, n)
+        else:
+            solution, complete = None, False
 
         time_val, optimal, solution, obj = utils.process_result(
-            ampl, solution, elapsed_time, use_optimization
+            ampl, solution, complete, elapsed_time, use_optimization
         )
 
         utils.print_solution(time_val, optimal, solution, obj)
 
-        results_dict[key] = {
+        entry = {
             "sol": solution,
             "time": time_val,
             "optimal": optimal,
@@ -187,17 +173,51 @@ def run_model(results_dict, n, solver, use_sb=False, use_optimization=False):
 
     except Exception:
         traceback.print_exc()
-        results_dict[key] = {
+        entry = {
             "sol": [],
             "time": 300,
             "optimal": False,
             "obj": None
         }
 
+    return key, entry
+
+
+def run_model(results_dict, n, solver, use_sb=False, use_optimization=False, warm_start=None):
+    """
+    Runs the MIP model with the given parameters and updates the results dictionary.
+
+    Params:
+        results_dict: Dictionary to store results
+        n: Number of teams (instances)
+        solver: The solver to use (e.g., "gurobi", "cplex")
+        use_sb: Whether to use symmetry breaking
+        use_optimization: Whether to use optimization techniques
+        warm_start: A schedule feasible for this configuration, used as MIP start (optional)
+    Returns:
+        results_dict: Updated dictionary with results for the given configuration
+    """
+
+    key, entry = run_model_task(n, solver, use_sb, use_optimization, warm_start=warm_start)
+    results_dict[key] = entry
+
     return results_dict
 
 
-def run_single_instance(n, solver, use_sb=False, use_optimization=False):
+def save_results(n, results_dict):
+    """
+    Writes the results of the given number of teams to the MIP results directory.
+
+    Params:
+        n: Number of teams (instances)
+        results_dict: Dictionary with the results of the configurations
+    """
+
+    os.makedirs(DEFAULT_MIP_OUTPUT_DIR, exist_ok=True)
+    utils.write_solution(DEFAULT_MIP_OUTPUT_DIR, n, results_dict)
+
+
+def run_single_instance(n, solver, use_sb=False, use_optimization=False, save=True):
     """
     Runs a single instance of the MIP model with the given parameters.
 
@@ -206,21 +226,32 @@ def run_single_instance(n, solver, use_sb=False, use_optimization=False):
         solver: The solver to use (e.g., "gurobi", "cplex")
         use_sb: Whether to use symmetry breaking
         use_optimization: Whether to use optimization techniques
+        save: Whether to write the results to the model's results file
+    Returns:
+        results_dict: Dictionary with the results of the configuration
     """
 
     if solver is None:
         solver = 'gurobi'
 
-    os.makedirs(DEFAULT_MIP_OUTPUT_DIR, exist_ok=True)
     results_dict = {}
     results_dict = run_model(results_dict, n, solver, use_sb, use_optimization)
 
-    utils.write_solution(DEFAULT_MIP_OUTPUT_DIR, n, results_dict)
+    if save:
+        save_results(n, results_dict)
+
+    return results_dict
 
 
 def run_all():
     """
     Runs all configurations for the MIP model.
+    Configurations are solved concurrently on up to MAX_WORKERS processes
+    (set CDMO_WORKERS=1 to run the sweep sequentially), each with its own AMPL instance.
+    A worker reuses its AMPL instance for every configuration it solves, so the sequential
+    sweep solves the whole batch in one AMPL process and needs a single license session.
+    The optimization version of a configuration starts from the schedule found by
+    its satisfaction version, which satisfies the same constraints.
     """
 
     solvers = ["gurobi", "cplex"]
@@ -228,12 +259,56 @@ def run_all():
     output_dir = DEFAULT_MIP_OUTPUT_DIR
     os.makedirs(output_dir, exist_ok=True)
 
-    for n in instances:
-        results_dict = {}
-
-        for solver in solvers:
-            for sb in [False, True]:
-                for opt in [False, True]:
-                    results_dict = run_model(results_dict, n, solver, sb, opt)
-
-        utils.write_solution(output_dir, n, results_dict)
+    configs = [
+        (n, solver, sb, opt)
+        for n in instances
+        for solver in solvers
+        for sb in [False, True]
+        for opt in [False, True]
+    ]
+
+    if MAX_WORKERS <= 1:
+        for n in instances:
+            results_dict = {}
+            for config in configs:
+                if config[0] != n:
+                    continue
+                _, solver, sb, opt = config
+                warm_start = results_dict[utils.make_key(solver, sb, False)]["sol"] if opt else None
+                results_dict = run_model(results_dict, *config, warm_start=warm_start)
+            utils.write_solution(output_dir, n, results_dict)
+        return
+
+    entries = {}
+    pending = {n: sum(1 for config in configs if config[0] == n) for n in instances}
+
+    # Threads left to each solver once every worker is busy
+    threads = max(1, MIP_THREADS // MAX_WORKERS)
+
+    # AMPL objects are not fork-safe: workers start fresh interpreters
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context) as executor:
+        def submit(config, warm_start=None):
+            return executor.submit(run_model_task, *config, threads, warm_start)
+
+        # Satisfaction runs first, each one unlocks its optimization run
+        futures = {submit(config): config for config in configs if not config[3]}
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                config = futures.pop(future)
+                entries[config] = future.result()
+
+                if not config[3]:
+                    opt_config = config[:3] + (True,)
+                    futures[submit(opt_config, entries[config][1]["sol"])] = opt_config
+
+                n = config[0]
+                pending[n] -= 1
+
+                # All configurations for n are done: write them in sweep order
+                if pending[n] == 0:
+                    results_dict = dict(entries[c] for c in configs if c[0] == n)
+                    utils.write_solution(output_dir, n, results_dict)
@@ -1,85 +1,74 @@
 import os
 import json
 
+# Reused for every results file; encode() runs the C encoder in one shot, unlike json.dump
+JSON_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+def get_active_values(ampl, name):
+    """
+    Reads the nonzero values of a binary AMPL variable with a single bulk transfer.
+
+    Params:
+        ampl: The amplpy.AMPL object after solving.
+        name: The name of the variable.
+    Returns:
+        A dictionary mapping the index tuple of each active entry to its (rounded) value.
+    """
+
+    values = ampl.get_variable(name).get_values().to_dict()
+    return {k: int(round(v)) for k, v in values.items() if v > 0.5}
+
 
 def parse_solution(ampl, variables_dict, W, P, n):
     """
     Parses the solution from the AMPL model.
     Params:
         ampl: The amplpy.AMPL object after solving.
-        variables_dict: Dictionary containing the parsed variables (y_dict, A_dict, H_dict)
-                       or a single variable name/dict for backward compatibility.
+        variables_dict: Dictionary containing the active entries of the variables (y_dict, A_dict, H_dict),
+                       as returned by get_active_values.
         W: Number of weeks.
         P: Number of periods.
         n: Number of teams.
     Returns:
-        A list of lists representing the schedule for each period.
+        A tuple containing:
+            - schedule: A list of lists representing the schedule for each period.
+            - complete: Boolean indicating if every (week, period) slot has a match.
+    """
+
+    A_active = variables_dict.get('A_dict', {})
+    H_active = variables_dict.get('H_dict', {})
+
+    schedule = [[None] * W for _ in range(P)]
+    filled = 0
+    for (i, k, w, p) in A_active:
+        if schedule[p - 1][w - 1] is None:
+            filled += 1
+        # A holds the unordered pair (i < k), H tells which team plays at home
+        schedule[p - 1][w - 1] = [k, i] if (k, i, w) in H_active else [i, k]
+
+    return schedule, filled == W * P
+
+
+def start_values(solution):
+    """
+    Builds the values of the decision variables encoding a schedule, to be used as MIP start.
+
+    Params:
+        solution: The schedule as a list of periods, each a list of [home, away] pairs per week.
+    Returns:
+        A tuple containing the values of the nonzero y, A and H variables, keyed by index.
     """
 
-    if isinstance(variables_dict, (str, dict)) and not isinstance(variables_dict, dict) or \
-            (isinstance(variables_dict, dict) and not any(key in variables_dict for key in ['A_dict', 'H_dict'])):
-        if isinstance(variables_dict, dict):
-            X_raw = {tuple(int(x) for x in k): float(v) for k, v in variables_dict.items()}
-        else:
-            X_name = variables_dict
-            var = ampl.get_variable(X_name)
-            df = var.get_values().to_pandas()
-            X_raw = {}
-            if not df.empty:
-                val_col = df.columns[-1]
-                idx_cols = df.columns[:-1]
-                for _, row in df.iterrows():
-                    indices = tuple(int(row[c]) for c in idx_cols)
-                    val = float(row[val_col])
-                    X_raw[indices] = val
-
-        X_active = {k: v for k, v in X_raw.items() if float(v) > 0.5}
-
-        schedule_weeks = []
-        for w in range(1, W + 1):
-            week_matches = []
-            for p in range(1, P + 1):
-                found = None
-                for h in range(1, n + 1):
-                    if found:
-                        break
-                    for a in range(1, n + 1):
-                        if h == a:
-                            continue
-                        if X_active.get((h, a, w, p), 0) != 0:
-                            found = [h, a]
-                            break
-                week_matches.append(found)
-            schedule_weeks.append(week_matches)
-
-        schedule_periods = [[schedule_weeks[w_idx][p_idx] for w_idx in range(W)] for p_idx in range(P)]
-        return schedule_periods
-
-    A_dict = variables_dict.get('A_dict', {})
-    H_dict = variables_dict.get('H_dict', {})
-
-    A_active = {k: v for k, v in A_dict.items() if float(v) > 0.5}
-    H_active = {k: v for k, v in H_dict.items() if float(v) > 0.5}
-
-    schedule_weeks = []
-    for w in range(1, W + 1):
-        week_matches = []
-        for p in range(1, P + 1):
-            found = None
-            for (i, k, week, period), val in A_active.items():
-                if week == w and period == p:
-                    if (i, k, w) in H_active:
-                        found = [i, k]
-                    elif (k, i, w) in H_active:
-                        found = [k, i]
-                    else:
-                        found = [i, k]
-                    break
-            week_matches.append(found)
-        schedule_weeks.append(week_matches)
-
-    schedule_periods = [[schedule_weeks[w_idx][p_idx] for w_idx in range(W)] for p_idx in range(P)]
-    return schedule_periods
+    y_start, A_start, H_start = {}, {}, {}
+    for p, row in enumerate(solution, start=1):
+        for w, (h, a) in enumerate(row, start=1):
+            i, k = min(h, a), max(h, a)
+            y_start[(i, k, w)] = 1
+            A_start[(i, k, w, p)] = 1
+            H_start[(h, a, w)] = 1
+
+    return y_start, A_start, H_start
 
 
 def make_key(solver_name, sb, opt):
@@ -141,13 +130,14 @@ def print_solution(time, optimal, solution, obj):
     print("\n".join(output) + "\n")
 
 
-def process_result(ampl, solution, elapsed_time, use_optimization):
+def process_result(ampl, solution, complete, elapsed_time, use_optimization):
     """
     Processes the result from an AMPL solver.
 
     Params:
         ampl: The amplpy. AMPL object after solving.
         solution: The parsed solution as a list of lists.
+        complete: Boolean indicating if the solution has a match in every slot.
         elapsed_time: The time taken to solve (in seconds).
         use_optimization: Boolean indicating if optimization is used.
 
@@ -158,9 +148,8 @@ def process_result(ampl, solution, elapsed_time, use_optimization):
             - solution: The parsed solution as a list of lists.
             - obj: The objective value if available, otherwise None.
     """
-    has_solution = True
-    if solution is None or any(cell is None for row in solution for cell in row):
-        has_solution = False
+    has_solution = solution is not None and complete
+    if not has_solution:
         solution = []
 
     obj = None
@@ -199,18 +188,16 @@ def write_solution(output_dir, n, results_dict):
         results_dict: A dictionary containing the results to be written.
     """
 
+    out = {
+        key: {
+            "time": val["time"],
+            "optimal": bool(val["optimal"]),
+            "obj": val["obj"],
+            "sol": val["sol"]
+        }
+        for key, val in results_dict.items()
+    }
+
     out_path = os.path.join(output_dir, f"{n}.json")
     with open(out_path, 'w') as f:
-        f.write('{\n')
-        for i, (key, val) in enumerate(results_dict.items()):
-            f.write(f'  "{key}": {{\n')
-
-            sol_str = json.dumps(val["sol"], separators=(',', ':'))
-            f.write(f'    "time": {val["time"]},\n')
-            f.write(f'    "optimal": {"true" if val["optimal"] else "false"},\n')
-            f.write(f'    "obj": {json.dumps(val["obj"])},\n')
-            f.write(f'    "sol": {sol_str}\n')
-
-            f.write('  }' + (',' if i < len(results_dict) - 1 else '') + '\n')
-        f.write('}\n')
-
+        f.write(JSON_ENCODER.encode(out) + '\n')
@@ -1,8 +1,9 @@
 from source.SAT.model import sat_model
+from itertools import combinations
 from z3 import *
 
 
-def build_model(n_teams, use_sb=False, use_optimization=False, max_diff_constraint=None):
+def build_model(n_teams, use_sb=False, use_optimization=False, max_diff_constraint=None, cnf_encoding=False):
     """
     Builds the SAT model with specified parameters.
     
@@ -11,10 +12,12 @@ def build_model(n_teams, use_sb=False, use_optimization=False, max_diff_constrai
         use_sb: Whether to use symmetry breaking
         use_optimization: Whether to use optimization techniques
         max_diff_constraint: maximum allowed home-away imbalance (optional)
+        cnf_encoding: Whether the model is exported to DIMACS, using clausal cardinality encodings
     Returns:
         tuple: (solver, home, per, weeks, periods, extra_params)
     """
-    solver = Solver()
+    # The model is pure QF_FD (Booleans and pseudo-Boolean constraints): use that backend directly
+    solver = Tactic('qffd').solver()
     solver.set("random_seed", 42)
     solver.set("timeout", 300_000)  # 5 minutes timeout
     
@@ -24,14 +27,15 @@ def build_model(n_teams, use_sb=False, use_optimization=False, max_diff_constrai
     Teams = list(range(num_teams))
     Weeks = list(range(num_weeks))
     Periods = list(range(num_periods))
+    Pairs = list(combinations(Teams, 2))  # shared by the constraints over each pair of teams
     
     # Create variables
     home, per = sat_model.create_variables(Teams, Weeks, Periods)
     
     # Add constraints
-    sat_model.add_hard_constraints(home, per, Teams, Weeks, Periods, solver)
-    sat_model.add_channeling_constraint(home, per, Teams, Weeks, Periods, solver)
-    sat_model.add_implied_constraints(home, per, Teams, Weeks, Periods, solver)  
+    sat_model.add_hard_constraints(home, per, Teams, Pairs, Weeks, Periods, solver, cnf_encoding)
+    sat_model.add_channeling_constraint(home, per, Pairs, Weeks, Periods, solver)
+    sat_model.add_implied_constraints(home, per, Teams, Pairs, Weeks, Periods, solver, cnf_encoding)
 
     if use_sb:
         sat_model.add_symmetry_breaking_constraints(home, per, Teams, Weeks, Periods, solver, use_optimization)
@@ -1,40 +1,161 @@
-from itertools import product
 from z3 import *
+import subprocess
+import threading
 
+# pb -> bitvector -> CNF, built once and reused for every conversion.
+# solve-eqs is left out on purpose: it eliminates fixed home/per variables
+# (e.g. under symmetry breaking), which then cannot be decoded from the solver output.
+CNF_TACTIC = Then('elim-and', 'pb2bv', 'bit-blast', 'tseitin-cnf')
 
-def solver_to_dimacs(solver):
+# Last DIMACS export, keyed by the AST ids of the exported assertions
+LAST_EXPORT = {}
+
+
+def cnf_goal(solver):
     """
-    Converts the assertions() of a Z3 solver into a DIMACS CNF string
-    and returns (dimacs_str, var_map).
-    var_map: { z3.BoolRef : int } mapping to DIMACS IDs.
+    Converts the assertions() of a Z3 solver into CNF, returning the resulting goal.
+    """
+    return CNF_TACTIC(And(solver.assertions()))
+
+
+def number_atoms(atoms):
     """
-    F = And(solver.assertions())
+    Assigns DIMACS IDs (from 1) to the atoms of a CNF, given as a collection of AST ids.
+    Atoms are ordered by AST id (creation order), which gives a deterministic numbering.
+    """
+    return {aid: i+1 for i, aid in enumerate(sorted(atoms))}
+
+
+def dimacs_var_map(dimacs_str):
+    """
+    Reads the var_map from the "c <id> <name>" comment lines that Goal.dimacs() appends
+    after the clauses.
+    """
+    var_map = {}
+    start = dimacs_str.find("\nc ")
+    if start < 0:
+        return var_map
+
+    for line in dimacs_str[start + 1:].splitlines():
+        if line.startswith("c "):
+            _, vid, name = line.split(" ", 2)
+            var_map[name] = int(vid)
 
-    # pb -> bitvector -> CNF
-    T = Then('elim-and', 'pb2bv', 'bit-blast', 'tseitin-cnf')
-    G = T(F)
+    return var_map
 
+
+def walk_dimacs(G):
+    """
+    Fallback for goals that Goal.dimacs() cannot export (several subgoals, or a Z3 build
+    that does not name the variables): walks the clauses in Python.
+    """
+    # Literals are kept as (AST id, negated): int keys avoid hashing (and comparing) Z3 wrappers
     clauses = []
-    atoms = set()
+    atoms = {}
 
     for subgoal in G:
-        for c in subgoal:
-            lits = list(c.children()) if is_or(c) else [c]
+        for k in range(subgoal.size()):
+            c = subgoal.get(k)
+            lits = []
+            for lit in (c.children() if is_or(c) else (c,)):
+                neg = is_not(lit)
+                if neg:
+                    lit = lit.arg(0)
+                aid = lit.get_id()
+                if aid not in atoms:
+                    atoms[aid] = lit
+                lits.append((aid, neg))
             clauses.append(lits)
-            for lit in lits:
-                atoms.add(lit.arg(0) if is_not(lit) else lit)
 
-    atoms = sorted(list(atoms), key=lambda a: a.decl().name())
-    var_map = {a: i+1 for i, a in enumerate(atoms)}
+    ids = number_atoms(atoms)
 
-    dimacs_lines = [f"p cnf {len(var_map)} {len(clauses)}"]
+    buf = [f"p cnf {len(ids)} {len(clauses)}\n"]
     for lits in clauses:
-        row = []
-        for lit in lits:
-            row.append(-var_map[lit.arg(0)] if is_not(lit) else var_map[lit])
-        dimacs_lines.append(" ".join(str(l) for l in row) + " 0")
+        row = [-ids[aid] if neg else ids[aid] for aid, neg in lits]
+        buf.append(" ".join(map(str, row)))
+        buf.append(" 0\n")
+
+    return "".join(buf), {atoms[aid].decl().name(): vid for aid, vid in ids.items()}
+
+
+def goal_to_dimacs(G):
+    """
+    Exports a CNF goal as (dimacs_str, var_map), natively through Goal.dimacs() when possible.
+    """
+    if len(G) == 1:
+        dimacs_str = G[0].dimacs()
+        var_map = dimacs_var_map(dimacs_str)
+        # Older Z3 releases do not append the variable names
+        if var_map and len(var_map) == int(dimacs_str.split(None, 3)[2]):
+            return dimacs_str, var_map
+
+    return walk_dimacs(G)
+
+
+def solver_to_dimacs(solver):
+    """
+    Converts the assertions() of a Z3 solver into a DIMACS CNF string
+    and returns (dimacs_str, var_map).
+    var_map: { variable name : int } mapping to DIMACS IDs.
+    The last export is reused while the solver holds the same assertions.
+    """
+    assertions = solver.assertions()
+    key = tuple(a.get_id() for a in assertions)
+
+    cached = LAST_EXPORT.get(key)
+    if cached is None:
+        LAST_EXPORT.clear()
+        # The assertions are kept alive with the result, so their AST ids cannot be reused
+        cached = LAST_EXPORT[key] = (assertions, goal_to_dimacs(cnf_goal(solver)))
 
-    return "\n".join(dimacs_lines) + "\n", var_map
+    return cached[1]
+
+
+def solver_to_var_map(solver):
+    """
+    Builds only the var_map that solver_to_dimacs would return.
+    """
+    return solver_to_dimacs(solver)[1]
+
+
+def extend_dimacs(dimacs_str, var_map, goal):
+    """
+    Appends the CNF of the constraints in goal to an already exported CNF, without converting it again.
+    Variables shared with the export keep their DIMACS IDs (matched by name); the auxiliary
+    variables introduced for goal get new IDs after the existing ones.
+    Returns (dimacs_str, var_map) for the whole CNF; var_map is the one of the original export.
+    """
+    extra_str, extra_map = goal_to_dimacs(CNF_TACTIC(goal))
+
+    header, body = dimacs_str.split("\n", 1)
+    _, _, num_vars, num_clauses = header.split()
+    next_id = int(num_vars) + 1
+
+    # Z3's fresh auxiliary names contain '!', model variables never do
+    renumber = {}
+    for name, vid in extra_map.items():
+        if "!" not in name and name in var_map:
+            renumber[vid] = var_map[name]
+        else:
+            renumber[vid] = next_id
+            next_id += 1
+
+    extra_clauses = []
+    for line in extra_str.splitlines()[1:]:
+        if not line or line.startswith("c"):
+            continue
+        lits = [int(tok) for tok in line.split()]
+        extra_clauses.append(" ".join(
+            str(renumber[lit] if lit > 0 else -renumber[-lit]) if lit else "0" for lit in lits
+        ))
+
+    buf = [f"p cnf {next_id - 1} {int(num_clauses) + len(extra_clauses)}\n", body]
+    if not body.endswith("\n"):
+        buf.append("\n")
+    buf.append("\n".join(extra_clauses))
+    buf.append("\n")
+
+    return "".join(buf), var_map
 
 
 def build_variable_mapping(home, per, var_map, Teams, Weeks, Periods):
@@ -43,7 +164,7 @@ def build_variable_mapping(home, per, var_map, Teams, Weeks, Periods):
 
     Parameters:
         home, per: 3D lists of Z3 variables
-        var_map: dictionary {z3_var: dimacs_id} produced by solver_to_dimacs
+        var_map: dictionary {variable_name: dimacs_id} produced by solver_to_dimacs
         Teams, Weeks, Periods: index ranges
     
     Returns:
@@ -51,27 +172,27 @@ def build_variable_mapping(home, per, var_map, Teams, Weeks, Periods):
                    "to_id": {variable_name: dimacs_id}}
     """
     mapping = {"to_var": {}, "to_id": {}}
-    z3name2id = {v.decl().name(): vid for v, vid in var_map.items()}
+    to_var, to_id = mapping["to_var"], mapping["to_id"]
 
     # home[i][j][w]
-    for i, j, w in product(Teams, Teams, Weeks):
-        if i == j:
-            continue
-        z3_var = home[i][j][w]
-        name = z3_var.decl().name()
-        vid = z3name2id.get(name)
-        if vid is not None:
-            mapping["to_var"][vid] = ("home", i, j, w)
-            mapping["to_id"][name] = vid
+    pairs = [(i, j) for i in Teams for j in Teams if i != j]
+    for i, j in pairs:
+        for w in Weeks:
+            name = home[i][j][w].decl().name()
+            vid = var_map.get(name)
+            if vid is not None:
+                to_var[vid] = ("home", i, j, w)
+                to_id[name] = vid
 
     # per[i][w][p]
-    for i, w, p in product(Teams, Weeks, Periods):
-        z3_var = per[i][w][p]
-        name = z3_var.decl().name()
-        vid = z3name2id.get(name)
-        if vid is not None:
-            mapping["to_var"][vid] = ("period", i, w, p)
-            mapping["to_id"][name] = vid
+    for i in Teams:
+        for w in Weeks:
+            for p in Periods:
+                name = per[i][w][p].decl().name()
+                vid = var_map.get(name)
+                if vid is not None:
+                    to_var[vid] = ("period", i, w, p)
+                    to_id[name] = vid
 
     return mapping
 
@@ -86,38 +207,73 @@ def get_all_variables_for_dimacs_from_variables_only(home, per, Teams, Weeks, Pe
          "to_id": {variable_name: dimacs_id}}
     """
     try:
-        # 1) DIMACS + Z3-var -> DIMACS-id map
-        _, var_map = solver_to_dimacs(solver)
-        z3name2id = {v.decl().name(): vid for v, vid in var_map.items()}
-
-        mapping = {"to_var": {}, "to_id": {}}
-
-        # 2) home[i][j][w]
-        for i in Teams:
-            for j in Teams:
-                if i == j:
-                    continue
-                for w in Weeks:
-                    var = home[i][j][w]
-                    name = var.decl().name()
-                    vid = z3name2id.get(name)
-                    if vid is not None:
-                        mapping["to_var"][vid] = ("home", i, j, w)
-                        mapping["to_id"][name] = vid
-
-        # 3) per[i][w][p]
-        for i in Teams:
-            for w in Weeks:
-                for p in Periods:
-                    var = per[i][w][p]
-                    name = var.decl().name()
-                    vid = z3name2id.get(name)
-                    if vid is not None:
-                        mapping["to_var"][vid] = ("period", i, w, p)
-                        mapping["to_id"][name] = vid
-
-        return mapping
+        var_map = solver_to_var_map(solver)
+        return build_variable_mapping(home, per, var_map, Teams, Weeks, Periods)
 
     except Exception as e:
         print(f"[ERROR] in get_all_variables_for_dimacs_from_variables_only: {e}")
         return None
+
+
+def run_dimacs(dimacs_solver_path, dimacs_str, timeout, on_start=None, args=("-model",)):
+    """
+    Runs an external DIMACS solver (e.g. Glucose) on a CNF string, passed on its standard input.
+    on_start, if given, receives the solver process as soon as it is started (so that it can be stopped).
+    args are the solver's command line options (Glucose needs -model to print the assignment).
+
+    The output is read as it is produced and only the solution lines ("s" and "v") are kept:
+    the comment lines (search statistics) are dropped, and anything else is returned as errors.
+    The pipes are binary, so the dropped lines are never decoded.
+
+    Returns:
+        (return_code, solution_lines, errors); subprocess.TimeoutExpired is raised, after killing the solver, on timeout
+    """
+    # Without an input file the solvers read the CNF from stdin
+    proc = subprocess.Popen(
+        [dimacs_solver_path, *args],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    if on_start is not None:
+        on_start(proc)
+
+    def feed():
+        try:
+            proc.stdin.write(dimacs_str.encode())
+            proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            # The solver was stopped before reading the whole CNF
+            pass
+
+    # The CNF is written from another thread, so that the output pipe is drained meanwhile
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+
+    expired = threading.Event()
+
+    def expire():
+        expired.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, expire)
+    timer.start()
+    try:
+        solution, errors = [], []
+        for line in proc.stdout:
+            if line.startswith(b"c"):
+                continue
+            if line.startswith((b"s", b"v")):
+                solution.append(line)
+            else:
+                errors.append(line)
+        proc.wait()
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+        writer.join()
+
+    if expired.is_set():
+        raise subprocess.TimeoutExpired(proc.args, timeout)
+
+    return proc.returncode, b"".join(solution).decode(), b"".join(errors).decode(errors="replace")
@@ -1,24 +1,46 @@
 from source.SAT.build_model import build_model
 from source.SAT.optimization import *
 from source.SAT.dimacs import *
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
 import subprocess
 from z3 import *
-import tempfile
 import time
 import os
 
 SOLVERS = {
     "z3": None,
-    "glucose": "/usr/local/bin/glucose"
+    "glucose": "/usr/local/bin/glucose",
+    "cadical": "/usr/local/bin/cadical",
+    "kissat": "/usr/local/bin/kissat",
+    "treengeling": "/usr/local/bin/treengeling"
 }
 
+# Command line options of the DIMACS solvers: all of them exit with 10 (SAT) / 20 (UNSAT)
+# and print "s"/"v" lines, but only Glucose needs to be asked for the model
+SOLVER_ARGS = {
+    "glucose": ("-model",),
+    "cadical": (),
+    "kissat": (),
+    "treengeling": ("-t", str(os.cpu_count() or 1))
+}
+
+# Threads used by Z3's SAT core (1 by default: a single-threaded search is reproducible)
+Z3_THREADS = int(os.getenv("Z3_THREADS", 1))
+
+# Time budget of an instance, in seconds, shared by model building, export and solving
+TIME_LIMIT = 300
+
 
 def solve_instance(n_teams, solver_name, use_sb=False, use_optimization=False, path=None):
     """
     Solves a SAT instance with optional home-away optimization.
+    The Z3 searches (regular and optimization) run on Z3_THREADS threads.
     Returns a structured result.
     """
-    start_time = time.time()
+    # Monotonic clock: the shared deadline is not affected by wall-clock adjustments
+    start_time = time.monotonic()
+    deadline = start_time + TIME_LIMIT
     Teams = list(range(n_teams))
 
     # -----------------------------
@@ -26,7 +48,8 @@ def solve_instance(n_teams, solver_name, use_sb=False, use_optimization=False, p
     # -----------------------------
     if use_optimization and solver_name.lower() == "z3":
         model, home, per, max_diff, elapsed = optimize_home_away_difference(
-            n_teams, use_sb, timeout=300
+            n_teams, use_sb, timeout=TIME_LIMIT, deadline=deadline,
+            threads=Z3_THREADS
         )
         num_weeks, num_periods = n_teams - 1, n_teams // 2
 
@@ -47,13 +70,14 @@ def solve_instance(n_teams, solver_name, use_sb=False, use_optimization=False, p
         }
 
     # -----------------------------
-    # Optimization + Glucose branch
+    # Optimization + DIMACS solver (Glucose, CaDiCaL, ...) branch
     # -----------------------------
-    elif use_optimization and solver_name.lower() == "glucose":
+    elif use_optimization and solver_name.lower() in SOLVER_ARGS:
         if path is None:
-            raise ValueError("For optimization with Glucose you must provide the executable path")
+            raise ValueError(f"For optimization with {solver_name} you must provide the executable path")
 
-        result = optimize_home_away_difference_glucose(n_teams, path, use_sb, timeout=300)
+        result = optimize_home_away_difference_glucose(n_teams, path, use_sb, timeout=TIME_LIMIT, deadline=deadline,
+                                                       solver_args=SOLVER_ARGS[solver_name.lower()])
 
         return {
             "status": sat if result["dimacs_output"] else unsat,
@@ -72,27 +96,45 @@ def solve_instance(n_teams, solver_name, use_sb=False, use_optimization=False, p
             "variable_mapping": result["variable_mapping"],
         }
 
+    elif use_optimization and solver_name.lower() == "portfolio":
+        raise ValueError("The portfolio solver is only available without optimization")
+
+    # -----------------------------
+    # Portfolio (Z3 and Glucose) branch
+    # -----------------------------
+    elif solver_name.lower() == "portfolio":
+        return solve_portfolio(n_teams, use_sb, use_optimization, start_time, solvers_config=SOLVERS)
+
     # -----------------------------
     # Regular SAT solving
     # -----------------------------
     else:
         solver, home, per, Weeks, Periods, extra_params = build_model(
-            n_teams, use_sb, use_optimization
+            n_teams, use_sb, use_optimization, cnf_encoding=solver_name.lower() != "z3"
         )
 
         if solver_name.lower() == "z3":
-            return solve_with_z3(solver, home, per, Weeks, Periods, extra_params, start_time)
+            return solve_with_z3(solver, home, per, Weeks, Periods, extra_params, start_time, Z3_THREADS)
         else:
             return solve_with_dimacs(solver, home, per, solver_name, Weeks, Periods, extra_params, start_time, solvers_config=SOLVERS,)
 
 
-def solve_with_z3(solver, home, per, Weeks, Periods, extra_params, start_time):
+def solve_with_z3(solver, home, per, Weeks, Periods, extra_params, start_time, threads=1):
     """
     Solve the SAT instance using Z3 solver and return a structured result.
+    threads is the number of threads of Z3's SAT core.
     """
+    if threads > 1:
+        # The model runs on the qffd (SAT) backend, whose parallelism is the threads parameter
+        solver.set("threads", threads)
+
+    # Only what is left of the instance budget after building the model
+    remaining = start_time + TIME_LIMIT - time.monotonic()
+    solver.set("timeout", max(1, int(remaining * 1000)))
+
     try:
         status = solver.check()
-        elapsed_time = time.time() - start_time
+        elapsed_time = time.monotonic() - start_time
         is_optimal = status == sat
 
         return {
@@ -115,83 +157,144 @@ def solve_with_z3(solver, home, per, Weeks, Periods, extra_params, start_time):
         }
 
 
+def solve_portfolio(n_teams, use_sb, use_optimization, start_time, solvers_config=None):
+    """
+    Races Z3 and Glucose on the same instance, returning the first conclusive result
+    and stopping the other solver.
+    """
+
+    if solvers_config is None:
+        solvers_config = {}
+
+    glucose_path = solvers_config.get("glucose")
+    if not glucose_path:
+        raise ValueError("DIMACS solver path not provided for: glucose")
+
+    # Everything that touches Z3 objects is done here, before the race:
+    # the Z3 context is shared and the Glucose thread only runs the external process
+    cnf_solver, home, per, Weeks, Periods, extra_params = build_model(n_teams, use_sb, use_optimization, cnf_encoding=True)
+    dimacs_str, var_map = solver_to_dimacs(cnf_solver)
+    variable_mapping = build_variable_mapping(home, per, var_map, list(range(n_teams)), Weeks, Periods)
+    z3_solver, *_ = build_model(n_teams, use_sb, use_optimization)
+
+    # A Glucose process started after the race is decided is stopped right away
+    stopped = threading.Event()
+    procs = []
+
+    def on_start(proc):
+        procs.append(proc)
+        if stopped.is_set():
+            proc.kill()
+
+    results = {}
+    winner = None
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        z3_future = executor.submit(solve_with_z3, z3_solver, home, per, Weeks, Periods, extra_params, start_time)
+        glucose_future = executor.submit(run_dimacs_solver, glucose_path, "glucose", dimacs_str, var_map,
+                                         variable_mapping, Weeks, Periods, extra_params, start_time, on_start)
+
+        pending = {z3_future, glucose_future}
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[future] = future.result()
+                # Timeouts and interruptions come back without solver stats
+                if results[future]["status"] in (sat, unsat) and "stats" in results[future]:
+                    winner = future
+
+        stopped.set()
+        if not z3_future.done():
+            z3_solver.interrupt()
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+
+    if winner is None:
+        return results.get(z3_future) or z3_future.result()
+    return results[winner]
+
+
 def solve_with_dimacs(solver, home, per, solver_name, Weeks, Periods, extra_params, start_time, solvers_config=None, instance_name=None):
     """
-    Solve using an external DIMACS solver (Glucose) with proper file handling and unique temporary files,
+    Solve using an external DIMACS solver (Glucose, CaDiCaL, Kissat or Treengeling)
     and return a structured result.
     """
 
     if solvers_config is None:
         solvers_config = {}
 
-    cnf_file = None
+    # Get solver path
+    solver_name = solver_name.lower()
+    dimacs_solver_path = solvers_config.get(solver_name)
+    if not dimacs_solver_path:
+        raise ValueError(f"DIMACS solver path not provided for: {solver_name}")
+
+    Teams = list(range(len(home)))
+
+    # 1. Build DIMACS string and mapping
+    dimacs_str, var_map = solver_to_dimacs(solver)
+
+    # 2. Build structured variable mapping for home/per
+    variable_mapping = build_variable_mapping(home, per, var_map, Teams, Weeks, Periods)
+    if variable_mapping is None:
+        print("Variable mapping failed")
+        variable_mapping = get_all_variables_for_dimacs_from_variables_only(
+            home, per, Teams, Weeks, Periods, solver
+        )
+
+    return run_dimacs_solver(dimacs_solver_path, solver_name, dimacs_str, var_map, variable_mapping,
+                             Weeks, Periods, extra_params, start_time)
+
+
+def run_dimacs_solver(dimacs_solver_path, solver_name, dimacs_str, var_map, variable_mapping, Weeks, Periods, extra_params, start_time, on_start=None):
+    """
+    Runs an external DIMACS solver on an exported CNF and returns a structured result.
+    on_start, if given, receives the solver process as soon as it is started (so that it can be stopped).
+    """
+
     try:
-        # Get solver path
-        dimacs_solver_path = solvers_config.get(solver_name)
-        if not dimacs_solver_path:
-            raise ValueError(f"DIMACS solver path not provided for: {solver_name}")
-
-        Teams = list(range(len(home)))
-
-        # 1. Build DIMACS string and mapping
-        dimacs_str, var_map = solver_to_dimacs(solver)
-
-        # 2. Build structured variable mapping for home/per
-        variable_mapping = build_variable_mapping(home, per, var_map, Teams, Weeks, Periods)
-        if variable_mapping is None:
-            print("Variable mapping failed")
-            variable_mapping = get_all_variables_for_dimacs_from_variables_only(
-                home, per, Teams, Weeks, Periods, solver
-            )
-
-        # 3. Write DIMACS to temporary file
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".cnf", delete=False) as tmp_file:
-            cnf_file = tmp_file.name
-            tmp_file.write(dimacs_str)
-
-        # 4. Execute external solver
-        result = subprocess.run(
-            [dimacs_solver_path, "-model", cnf_file],
-            capture_output=True,
-            text=True,
-            timeout=max(1, 300 - (time.time() - start_time)),
+        # 3-4. Write the CNF and execute the external solver, within the instance deadline
+        returncode, stdout, stderr = run_dimacs(
+            dimacs_solver_path, dimacs_str, max(1, start_time + TIME_LIMIT - time.monotonic()), on_start,
+            SOLVER_ARGS.get(solver_name, ("-model",))
         )
-        elapsed_time = time.time() - start_time
+        elapsed_time = time.monotonic() - start_time
 
         # 5. Determine status
-        if result.returncode == 10:
+        if returncode == 10:
             status = sat
-        elif result.returncode == 20:
+        elif returncode == 20:
             status = unsat
         else:
             status = unknown
-            print(f"Unexpected return code: {result.returncode}")
-            if result.stderr:
-                print(f"Solver stderr: {result.stderr[:200]}...")
+            # A negative code means the process was killed (e.g. it lost a portfolio race)
+            if returncode >= 0:
+                print(f"Unexpected return code: {returncode}")
+                if stderr:
+                    print(f"Solver stderr: {stderr[:200]}...")
 
         # 6. Build result dictionary
         result_dict = {
             "status": status,
             "time": elapsed_time,
             "stats": {
-                "return_code": result.returncode,
+                "return_code": returncode,
                 "solver": solver_name,
-                "stdout_lines": len(result.stdout.splitlines()),
-                "stderr_lines": len(result.stderr.splitlines()),
+                "stdout_lines": len(stdout.splitlines()),
+                "stderr_lines": len(stderr.splitlines()),
                 "variables_count": len(var_map),
             },
             "variables": None,
             "weeks": Weeks,
             "periods": Periods,
             "extra_params": extra_params,
-            "solver_output": result.stdout,
-            "solver_error": result.stderr,
+            "solver_output": stdout,
+            "solver_error": stderr,
             "variable_mapping": variable_mapping,
-            "cnf_file": cnf_file,
         }
 
         if status == sat:
-            result_dict["dimacs_output"] = result.stdout
+            result_dict["dimacs_output"] = stdout
 
         return result_dict
 
@@ -204,9 +307,3 @@ def solve_with_dimacs(solver, home, per, solver_name, Weeks, Periods, extra_para
             "solver_error": "Timeout or interrupted by user",
             "variable_mapping": {}
         }
-    finally:
-        if cnf_file and os.path.exists(cnf_file):
-            try:
-                os.unlink(cnf_file)
-            except Exception as cleanup_error:
-                print(f"Warning: Could not cleanup {cnf_file}: {cleanup_error}")
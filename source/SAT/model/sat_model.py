@@ -58,93 +58,166 @@ def at_least_k(bool_vars, k, name=None):
     return PbGe([(var, 1) for var in bool_vars], k)
 
 def exactly_k(bool_vars, k, name=None):
-    return And(at_most_k(bool_vars, k), at_least_k(bool_vars, k))
+    return PbEq([(var, 1) for var in bool_vars], k)
+
+def at_most_k_seq(bool_vars, k, name):
+    # Sinz's sequential counter: s[i][j] holds if at least j+1 of the first i+1 variables are true.
+    # O(n*k) clauses and auxiliary variables (named after name), already in CNF
+    n = len(bool_vars)
+    if n <= k:
+        return BoolVal(True)
+
+    x = bool_vars
+    s = [[Bool(f"{name}_{i}_{j}") for j in range(k)] for i in range(n - 1)]
+
+    clauses = [Or(Not(x[0]), s[0][0])] + [Not(s[0][j]) for j in range(1, k)]
+    for i in range(1, n - 1):
+        clauses.append(Or(Not(x[i]), s[i][0]))
+        clauses.append(Or(Not(s[i - 1][0]), s[i][0]))
+        for j in range(1, k):
+            clauses.append(Or(Not(x[i]), Not(s[i - 1][j - 1]), s[i][j]))
+            clauses.append(Or(Not(s[i - 1][j]), s[i][j]))
+        clauses.append(Or(Not(x[i]), Not(s[i - 1][k - 1])))
+    clauses.append(Or(Not(x[n - 1]), Not(s[n - 2][k - 1])))
+
+    return And(clauses)
+
+def exactly_one_seq(bool_vars, name):
+    # Clausal exactly-one: pairwise at-most-one for small groups, sequential counter otherwise
+    if len(bool_vars) <= 6:
+        amo = [Or(Not(a), Not(b)) for a, b in combinations(bool_vars, 2)]
+    else:
+        amo = [at_most_k_seq(bool_vars, 1, name)]
+    return And([at_least_one(bool_vars)] + amo)
+
+def exactly_k_seq(bool_vars, k, name):
+    # Sequential counter for the upper bound; the lower bound stays pseudo-Boolean
+    return And(at_most_k_seq(bool_vars, k, name), at_least_k(bool_vars, k))
 
 
 # ----------------
 # HARD CONSTRAINTS
 # ----------------
 
-def constraint_each_pair_once(home, Teams, Weeks, s):
-    for i, j in combinations(Teams, 2):
-        if i != j:
-            s.add(exactly_one([home[i][j][w] for w in Weeks] + [home[j][i][w] for w in Weeks]))
+def constraint_each_pair_once(home, Pairs, Weeks, s, cnf_encoding=False):
+    constraints = []
+    for i, j in Pairs:
+        matches = home[i][j] + home[j][i]
+        if cnf_encoding:
+            constraints.append(exactly_one_seq(matches, f"m_{i}_{j}"))
+        else:
+            constraints.append(exactly_one(matches))
 
+    s.add(*constraints)
 
-def constraint_one_match_per_week(home, Teams, Weeks, s):
+
+def constraint_one_match_per_week(home, Teams, Weeks, s, cnf_encoding=False):
+    constraints = []
     for i in Teams:
+        home_i = home[i]
+        opponents = [j for j in Teams if j != i]
         for w in Weeks:
             week_match = []
-            for j in Teams:
-                if i != j:
-                    week_match.append(home[i][j][w])
-                    week_match.append(home[j][i][w])
-            s.add(exactly_one(week_match))  
+            for j in opponents:
+                week_match.append(home_i[j][w])
+                week_match.append(home[j][i][w])
+            if cnf_encoding:
+                constraints.append(exactly_one_seq(week_match, f"o_{i}_{w}"))
+            else:
+                constraints.append(exactly_one(week_match))
+
+    s.add(*constraints)
 
 
-def constraint_max_two_per_period(per, Teams, Weeks, Periods, s):
+def constraint_max_two_per_period(per, Teams, Weeks, Periods, s, cnf_encoding=False):
+    constraints = []
     for t in Teams:
+        per_t = per[t]
         for p in Periods:
-            matches_period = [per[t][w][p] for w in Weeks]
-            s.add(at_most_k(matches_period, 2))
+            matches_period = [per_t[w][p] for w in Weeks]
+            if cnf_encoding:
+                # Smaller CNF than pb2bv for external solvers; Z3 is faster on the native PB atoms
+                constraints.append(at_most_k_seq(matches_period, 2, f"c_{t}_{p}"))
+            else:
+                constraints.append(at_most_k(matches_period, 2))
+
+    s.add(*constraints)
 
 
-def add_hard_constraints(home, per, Teams, Weeks, Periods, s):
-    constraint_each_pair_once(home, Teams, Weeks, s)
-    constraint_one_match_per_week(home, Teams, Weeks, s)
-    constraint_max_two_per_period(per, Teams, Weeks, Periods, s)
+def add_hard_constraints(home, per, Teams, Pairs, Weeks, Periods, s, cnf_encoding=False):
+    constraint_each_pair_once(home, Pairs, Weeks, s, cnf_encoding)
+    # Implied by the other constraints, but needed for propagation: without it Z3
+    # takes 30s instead of 1.5s on n=12, and times out on n=14
+    constraint_one_match_per_week(home, Teams, Weeks, s, cnf_encoding)
+    constraint_max_two_per_period(per, Teams, Weeks, Periods, s, cnf_encoding)
 
 
 # ----------------------
 # CHANNELING CONSTRAINT
 # ----------------------
 
-def constraint_period_consistency(home, per, Teams, Weeks, Periods, s):
+def constraint_period_consistency(home, per, Pairs, Weeks, Periods, s):
+    constraints = []
     for w in Weeks:
-        for i in Teams:
-            for j in Teams:
-                if i < j:  # only once per pair
-                    match_occurs = Or(home[i][j][w], home[j][i][w])
-                    
-                    for p in Periods:
-                        # If match occurs, then (¬per[i] ∨ per[j])
-                        s.add(Or(Not(match_occurs), Not(per[i][w][p]), per[j][w][p]))
-                        
-                        # If match occurs, then (per[i] ∨ ¬per[j])
-                        s.add(Or(Not(match_occurs), per[i][w][p], Not(per[j][w][p])))
+        for i, j in Pairs:  # only once per pair
+            no_match = Not(Or(home[i][j][w], home[j][i][w]))
+            per_i, per_j = per[i][w], per[j][w]
+
+            for p in Periods:
+                # If match occurs, then (¬per[i] ∨ per[j])
+                constraints.append(Or(no_match, Not(per_i[p]), per_j[p]))
 
-def add_channeling_constraint(home, per, Teams, Weeks, Periods, s):
-    constraint_period_consistency(home, per, Teams, Weeks, Periods, s)
+                # If match occurs, then (per[i] ∨ ¬per[j])
+                constraints.append(Or(no_match, per_i[p], Not(per_j[p])))
+
+    s.add(*constraints)
+
+def add_channeling_constraint(home, per, Pairs, Weeks, Periods, s):
+    constraint_period_consistency(home, per, Pairs, Weeks, Periods, s)
 
 
 # -------------------
 # IMPLIED CONSTRAINTS
 # -------------------
 
-def constraint_two_teams_period(per, Teams, Weeks, Periods, s):
+def constraint_two_teams_period(per, Teams, Weeks, Periods, s, cnf_encoding=False):
+    constraints = []
     for w in Weeks:
         for p in Periods:
-            matches_period = [per[i][w][p] for i in Teams]
-            s.add(exactly_k(matches_period, 2))
+            matches_period = [per_i[w][p] for per_i in per]
+            if cnf_encoding:
+                constraints.append(exactly_k_seq(matches_period, 2, f"t_{w}_{p}"))
+            else:
+                constraints.append(exactly_k(matches_period, 2))
+
+    s.add(*constraints)
 
 
-def constrain_home_symmetry(home, Teams, Weeks, s):
-    for i, j in combinations(Teams, 2):
+def constrain_home_symmetry(home, Pairs, Weeks, s):
+    constraints = []
+    for i, j in Pairs:
         for w in Weeks:
-            s.add(Or(Not(home[i][j][w]), Not(home[j][i][w])))
+            constraints.append(Or(Not(home[i][j][w]), Not(home[j][i][w])))
 
+    s.add(*constraints)
 
-def constraint_one_period_a_week(per, Teams, Weeks, Periods, s):
+
+def constraint_one_period_a_week(per, Teams, Weeks, Periods, s, cnf_encoding=False):
+    constraints = []
     for i in Teams:
         for w in Weeks:
-            week_periods = [per[i][w][p] for p in Periods]
-            s.add(exactly_one(week_periods))
+            if cnf_encoding:
+                constraints.append(exactly_one_seq(per[i][w], f"w_{i}_{w}"))
+            else:
+                constraints.append(exactly_one(per[i][w]))
+
+    s.add(*constraints)
 
 
-def add_implied_constraints(home, per, Teams, Weeks, Periods, s):
-    constraint_two_teams_period(per, Teams, Weeks, Periods, s)
-    constrain_home_symmetry(home, Teams, Weeks, s)
-    constraint_one_period_a_week(per, Teams, Weeks, Periods, s)
+def add_implied_constraints(home, per, Teams, Pairs, Weeks, Periods, s, cnf_encoding=False):
+    constraint_two_teams_period(per, Teams, Weeks, Periods, s, cnf_encoding)
+    constrain_home_symmetry(home, Pairs, Weeks, s)
+    constraint_one_period_a_week(per, Teams, Weeks, Periods, s, cnf_encoding)
 
 
 # -----------------------------
@@ -152,24 +225,26 @@ def add_implied_constraints(home, per, Teams, Weeks, Periods, s):
 # -----------------------------
 
 def add_sb1(home, per, s):
-    s.add(home[0][1][0]) 
-    s.add(per[0][0][0])   
-    s.add(per[1][0][0])   
+    s.add(home[0][1][0], per[0][0][0], per[1][0][0])
 
 
 def add_sb2(home, Teams, Weeks, s):
+    constraints = []
     for w in Weeks:
         opponent = w + 1
         if opponent < len(Teams):
-            s.add(Or(home[0][opponent][w], home[opponent][0][w]))
+            constraints.append(Or(home[0][opponent][w], home[opponent][0][w]))
+
+    s.add(*constraints)
 
 
 def add_team_order_constraint(home, Teams, Weeks, s):
+    constraints = []
     for i in Teams:
-        for j in Teams:
-            for w in Weeks:
-                if i > j:
-                    s.add(Not(home[i][j][w]))
+        for j in range(i):
+            constraints.extend(Not(h) for h in home[i][j])
+
+    s.add(*constraints)
 
 
 def add_symmetry_breaking_constraints(home, per, Teams, Weeks, Periods, s, use_optimization):
@@ -183,19 +258,47 @@ def add_symmetry_breaking_constraints(home, per, Teams, Weeks, Periods, s, use_o
 # OPTIMIZATION CONSTRAINT
 # -----------------------
 
-def add_max_diff_constraint(home, Teams, Weeks, max_diff, s):
+def add_max_diff_constraint(home, Teams, Weeks, max_diff, s, cnf_encoding=False):
+    constraints = []
     total_games = len(Weeks)
     
     for i in Teams:
         home_games = []
         for j in Teams:
-            if i == j:
-                continue
-            for w in Weeks:
-                home_games.append(home[i][j][w])
+            home_games.extend(home[i][j])  # home[i][i] is empty
         
         min_home = (total_games - max_diff) // 2
         max_home = (total_games + max_diff) // 2
         
-        s.add(at_least_k(home_games, min_home))
-        s.add(at_most_k(home_games, max_home))
\ No newline at end of file
+        if cnf_encoding:
+            # At least min_home home games is at most total_games - min_home away games
+            away_games = []
+            for j in Teams:
+                away_games.extend(home[j][i])  # home[i][i] is empty
+            constraints.append(at_most_k_seq(away_games, total_games - min_home, f"l_{i}"))
+            constraints.append(at_most_k_seq(home_games, max_home, f"u_{i}"))
+        else:
+            constraints.append(at_least_k(home_games, min_home))
+            constraints.append(at_most_k(home_games, max_home))
+
+    s.add(*constraints)
+
+# ----------
+# WARM START
+# ----------
+
+def kirkman_schedule(Teams, Weeks):
+    # Circle method: team 0 is fixed, the others rotate. Yields (week, home team, away team)
+    # for a round robin where every team has at most one home game more than away games,
+    # and team 0 hosts team 1 and meets team w+1 in week w, as in the symmetry breaking
+    n = len(Teams)
+    for w in Weeks:
+        yield (w, 0, w + 1) if w % 2 == 0 else (w, w + 1, 0)
+        for k in range(1, n // 2):
+            a, b = (w + k) % (n - 1) + 1, (w - k) % (n - 1) + 1
+            yield (w, a, b) if k % 2 else (w, b, a)
+
+
+def add_warm_start_constraint(home, Teams, Weeks, warm, s):
+    # Fixes the matches of kirkman_schedule when the solver is checked under the warm literal
+    s.add(Implies(warm, And([home[h][a][w] for w, h, a in kirkman_schedule(Teams, Weeks)])))
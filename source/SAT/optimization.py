@@ -1,23 +1,48 @@
-from source.SAT.model.sat_model import add_max_diff_constraint
+from source.SAT.model.sat_model import add_max_diff_constraint, add_warm_start_constraint
 from source.SAT.dimacs import solver_to_dimacs
 from .build_model import build_model
 from source.SAT.dimacs import *
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
 from z3 import *
-import tempfile
+import threading
 import time
 import os
 
+# Glucose runs launched at once by the optimization search (one per core by default)
+GLUCOSE_WORKERS = int(os.getenv("GLUCOSE_WORKERS", os.cpu_count() or 1))
 
-def optimize_home_away_difference(n_teams, use_sb=False, timeout=300):
+
+@contextmanager
+def max_diff_bound(solver, home, Teams, Weeks, max_diff):
+    """
+    Adds the max imbalance constraint to the solver for the duration of the block,
+    so the base model is built once and only the bound changes between iterations.
+    """
+    solver.push()
+    try:
+        add_max_diff_constraint(home, Teams, Weeks, max_diff, solver)
+        yield solver
+    finally:
+        solver.pop()
+
+
+def optimize_home_away_difference(n_teams, use_sb=False, timeout=300, deadline=None, threads=1):
     """
     Optimize home-away difference using binary search on max imbalance (Z3).
+    deadline, if given, is the time.monotonic() instant by which the search must end.
+    threads is the number of threads of Z3's SAT core for every check of the search.
     """
-    start_time = time.time()
+    start_time = time.monotonic()
+    if deadline is None:
+        deadline = start_time + timeout
 
     try:
         # Base model
         solver, home, per, Weeks, Periods, _ = build_model(n_teams, use_sb, use_optimization=True)
+        if threads > 1:
+            solver.set("threads", threads)
         Teams = list(range(n_teams))
         total_weeks = n_teams - 1
 
@@ -25,33 +50,39 @@ def optimize_home_away_difference(n_teams, use_sb=False, timeout=300):
         lower_bound, upper_bound = 1, total_weeks
         best_model, best_max_diff = None, upper_bound
 
+        # The round robin template meets every bound: checking under warm only leaves the periods
+        # to the search. The template is dropped if no period assignment completes it
+        warm = Bool("warm")
+        add_warm_start_constraint(home, Teams, Weeks, warm, solver)
+
         # Binary search loop
-        while lower_bound <= upper_bound and (time.time() - start_time) < timeout:
+        while lower_bound <= upper_bound and time.monotonic() < deadline:
             mid = (lower_bound + upper_bound) // 2
             print(f"Testing max_imbalance = {mid}")
 
-            solver.push()
             # Add max imbalance constraint
-            add_max_diff_constraint(home, Teams, Weeks, mid, solver)
-
-            status = solver.check()
+            solver.set("timeout", max(1, int((deadline - time.monotonic()) * 1000)))
+            with max_diff_bound(solver, home, Teams, Weeks, mid):
+                status = solver.check(warm) if warm is not None else solver.check()
+                if status == unsat and warm is not None:
+                    warm = None
+                    status = solver.check()
+                if status == sat:
+                    best_model = solver.model()
 
             if status == sat:
-                best_model = solver.model()
                 best_max = mid
-                solver.pop()
                 upper_bound = mid - 1
                 if best_max == 1:
                     break
             else:
-                solver.pop()
                 lower_bound = mid + 1
 
 
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
 
         # Timeout with no solution
-        if (elapsed >= timeout and best_model is None):
+        if (time.monotonic() >= deadline and best_model is None):
             return None, None, None, None, timeout
 
         # Solution found or timeout with partial solution
@@ -62,11 +93,26 @@ def optimize_home_away_difference(n_teams, use_sb=False, timeout=300):
         return best_model, home, per, best_max, timeout
 
 
-def optimize_home_away_difference_glucose(n_teams, glucose_path, use_sb=False, timeout=300):
+def spread_bounds(lower, upper, k):
     """
-    Optimize home-away difference using binary search on max imbalance (Glucose).
+    Picks up to k max imbalance values splitting [lower, upper] evenly
+    (the midpoint when k == 1, as in a plain binary search).
     """
-    start_time = time.time()
+    return sorted({lower + i * (upper - lower) // (k + 1) for i in range(1, k + 1)})
+
+
+def optimize_home_away_difference_glucose(n_teams, glucose_path, use_sb=False, timeout=300, deadline=None,
+                                         solver_args=("-model",)):
+    """
+    Optimize home-away difference searching the max imbalance with parallel Glucose runs:
+    up to GLUCOSE_WORKERS bounds of the open interval are tested at once, each answer narrows
+    the interval and the runs whose bound falls outside it are stopped.
+    deadline, if given, is the time.monotonic() instant by which the search must end.
+    Any DIMACS solver can be used in place of Glucose, given its path and solver_args.
+    """
+    start_time = time.monotonic()
+    if deadline is None:
+        deadline = start_time + timeout
     Teams = list(range(n_teams))
     total_weeks = n_teams - 1
     num_weeks, num_periods = total_weeks, n_teams // 2
@@ -77,66 +123,90 @@ def optimize_home_away_difference_glucose(n_teams, glucose_path, use_sb=False, t
     best_dimacs_output = None
     best_variable_mapping = None
 
-    # 1. Build base model without max_diff constraint
-    base_solver, home, per, _, _, _ = build_model(n_teams, use_sb, use_optimization=True)
-
+    # 1. Build base model without max_diff constraint, export it and map its variables once
+    base_solver, home, per, _, _, _ = build_model(n_teams, use_sb, use_optimization=True, cnf_encoding=True)
+    base_dimacs, base_var_map = solver_to_dimacs(base_solver)
+    base_mapping = build_variable_mapping(home, per, base_var_map, Teams, Weeks, Periods)
+
+    # future -> (bound, variable mapping, stop event, started processes)
+    running = {}
+
+    def stop(job):
+        _, _, stopped, procs = job
+        stopped.set()
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+
+    def on_start_for(stopped, procs):
+        def on_start(proc):
+            procs.append(proc)
+            if stopped.is_set():
+                proc.kill()
+        return on_start
+
+    executor = ThreadPoolExecutor(max_workers=GLUCOSE_WORKERS)
     try:
-        while lower <= upper and (time.time() - start_time) < timeout:
-            mid = (lower + upper) // 2
-            print(f"Testing max_imbalance = {mid}")
-
-            # 2. Copy assertions into a temporary solver
-            temp_solver = Solver()
-            temp_solver.set("timeout", int((timeout - (time.time() - start_time)) * 1000))
-            for assertion in base_solver.assertions():
-                temp_solver.add(assertion)
-
-            # 3. Add max_diff constraint
-            add_max_diff_constraint(home, Teams, Weeks, mid, temp_solver)
-
-            # 4. Convert to DIMACS
-            temp_dimacs, var_map = solver_to_dimacs(temp_solver)
-
-            # 5. Build mapping from DIMACS
-            current_mapping = build_variable_mapping(home, per, var_map, Teams, Weeks, Periods)
-
-            # 6. Write CNF to temp file
-            cnf_file = None
-            try:
-                with tempfile.NamedTemporaryFile(mode="w+", suffix=".cnf", delete=False) as tmpfile:
-                    cnf_file = tmpfile.name
-                    tmpfile.write(temp_dimacs)
-
-                # 7. Run Glucose
-                result = subprocess.run(
-                    [glucose_path, "-model", cnf_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=max(1, timeout - (time.time() - start_time)),
-                )
-
-                if result.returncode == 10:  # SAT
+        while lower <= upper and time.monotonic() < deadline:
+            tested = {job[0] for job in running.values()}
+            for mid in spread_bounds(lower, upper, GLUCOSE_WORKERS - len(running)):
+                if mid in tested:
+                    continue
+                print(f"Testing max_imbalance = {mid}")
+
+                # 2-5. Append only the CNF of the max_diff constraint to the base export
+                # (Z3 is only used from this thread; the workers just wait on Glucose)
+                bound = Goal()
+                add_max_diff_constraint(home, Teams, Weeks, mid, bound, cnf_encoding=True)
+                temp_dimacs, _ = extend_dimacs(base_dimacs, base_var_map, bound)
+                current_mapping = base_mapping
+
+                # 6-7. Run Glucose
+                stopped, procs = threading.Event(), []
+                future = executor.submit(run_dimacs, glucose_path, temp_dimacs,
+                                         max(1, deadline - time.monotonic()),
+                                         on_start_for(stopped, procs), solver_args)
+                running[future] = (mid, current_mapping, stopped, procs)
+
+            if not running:
+                break
+
+            done, _ = wait(running, timeout=max(0, deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                break
+
+            for future in done:
+                mid, current_mapping, _, _ = running.pop(future)
+                # Answers outside the open interval no longer tell anything
+                if not lower <= mid <= upper:
+                    continue
+
+                returncode, stdout, _ = future.result()
+                if returncode == 10:  # SAT
                     best_max_diff = mid
-                    best_dimacs_output = result.stdout
+                    best_dimacs_output = stdout
                     best_variable_mapping = current_mapping
                     upper = mid - 1
-                elif result.returncode == 20:  # UNSAT
+                elif returncode == 20:  # UNSAT
                     lower = mid + 1
                 else:  # Unknown return code
                     lower = mid + 1
 
-            finally:
-                if cnf_file and os.path.exists(cnf_file):
-                    try:
-                        os.unlink(cnf_file)
-                    except Exception as cleanup_error:
-                        print(f"Warning: Could not remove temp file {cnf_file}: {cleanup_error}")
+            for job in running.values():
+                if not lower <= job[0] <= upper:
+                    stop(job)
 
     except (subprocess.TimeoutExpired, KeyboardInterrupt):
         # always return the best model found
         pass
 
-    elapsed_time = time.time() - start_time
+    finally:
+        for job in running.values():
+            stop(job)
+        executor.shutdown(wait=True)
+
+    elapsed_time = time.monotonic() - start_time
 
     return {
         "dimacs_output": best_dimacs_output,
@@ -1,4 +1,4 @@
-from source.SAT.instance_solver import solve_instance
+from source.SAT.instance_solver import solve_instance, SOLVERS
 from source.SAT import sat_utils as utils
 import os.path as pt
 from z3 import *
@@ -9,11 +9,9 @@ import gc
 current_dir = os.getcwd()
 DEFAULT_SAT_OUTPUT_DIR = os.path.join(current_dir, 'res/SAT')
 
-# Solvers
-SOLVERS = {
-    "z3": None,
-    "glucose": "/usr/local/bin/glucose"
-}
+# Solvers swept by run_all: the ones in the report by default, a comma-separated list of
+# SOLVERS names adds the others (e.g. SAT_SOLVERS=z3,glucose,cadical,kissat,treengeling)
+SWEEP_SOLVERS = os.getenv("SAT_SOLVERS", "z3,glucose").split(",")
 
 
 def sat_solver(n_teams, solver_name, use_sb=False, use_optimization=False):
@@ -29,7 +27,7 @@ def sat_solver(n_teams, solver_name, use_sb=False, use_optimization=False):
     Returns:
         dict: Result object containing solution and statistics
     """
-    path = SOLVERS[solver_name] if solver_name.lower() == "glucose" else None
+    path = SOLVERS.get(solver_name.lower())
 
     # Solve the instance
     result = solve_instance(n_teams, solver_name, use_sb, use_optimization, path)
@@ -85,7 +83,20 @@ def run_model(results_dict, n, solver, sb=False, opt=False):
     return results_dict
 
 
-def run_single_instance(n, solver, use_sb=False, use_optimization=False):
+def save_results(n, results_dict):
+    """
+    Writes the results of the given number of teams to the SAT results directory.
+
+    Params:
+        n: Number of teams (instances)
+        results_dict: Dictionary with the results of the configurations
+    """
+
+    os.makedirs(DEFAULT_SAT_OUTPUT_DIR, exist_ok=True)
+    utils.write_solution(DEFAULT_SAT_OUTPUT_DIR, n, results_dict)
+
+
+def run_single_instance(n, solver, use_sb=False, use_optimization=False, save=True):
     """
     Runs a single instance of the SAT model with the given parameters.
 
@@ -94,19 +105,22 @@ def run_single_instance(n, solver, use_sb=False, use_optimization=False):
         solver: The solver to use
         use_sb: Whether to use symmetry breaking
         use_optimization: Whether to use optimization techniques
+        save: Whether to write the results to the model's results file
+    Returns:
+        results_dict: Dictionary with the results of the configuration
     """
 
     if solver is None:
         solver = 'z3'
 
-    output_dir = DEFAULT_SAT_OUTPUT_DIR
-    os.makedirs(output_dir, exist_ok=True)
-
     results_dict = {}
 
     results_dict = run_model(results_dict, n, solver, use_sb, use_optimization)
 
-    utils.write_solution(output_dir, n, results_dict)
+    if save:
+        save_results(n, results_dict)
+
+    return results_dict
 
 
 def run_all():
@@ -114,7 +128,7 @@ def run_all():
     Runs all configurations for the SAT model.
     """
 
-    solvers = ["z3", "glucose"]
+    solvers = [solver for solver in SWEEP_SOLVERS if solver in SOLVERS]
     instances = [6, 8, 10, 12, 14, 16, 18]
     output_dir = DEFAULT_SAT_OUTPUT_DIR
     os.makedirs(output_dir, exist_ok=True)
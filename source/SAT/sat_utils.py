@@ -65,19 +65,24 @@ def parse_solution(result):
         per = result["variables"]["per"]
 
 
+        # One pass over the period variables finds the two teams of every slot,
+        # then a single home variable per match tells which team plays at home
         for w in Weeks:
+            slots = [[] for _ in Periods]
             for i in Teams:
-                for j in Teams:
-                    if i == j:
-                        continue
+                per_iw = per[i][w]
+                period = next((p for p in Periods if is_true(model.evaluate(per_iw[p], model_completion=True))), None)
+                if period is not None:
+                    slots[period].append(i)
 
-                    # Check if i plays at home vs j in week w
-                    if model.evaluate(home[i][j][w], model_completion=True):
-                        # Find the period where i plays this week
-                        period = next((p for p in Periods if model.evaluate(per[i][w][p], model_completion=True)), None)
-
-                        if period is not None and schedule_periods[period][w] is None:
-                            schedule_periods[period][w] = [i + 1, j + 1]  # 1-based teams
+            for period, teams in enumerate(slots):
+                if len(teams) != 2:
+                    continue
+                i, j = teams
+                if is_true(model.evaluate(home[i][j][w], model_completion=True)):
+                    schedule_periods[period][w] = [i + 1, j + 1]  # 1-based teams
+                elif is_true(model.evaluate(home[j][i][w], model_completion=True)):
+                    schedule_periods[period][w] = [j + 1, i + 1]
 
 
     # ----- DIMACS case -----
@@ -106,23 +111,24 @@ def parse_solution(result):
                     continue
                 assignments[abs(lit)] = (lit > 0)
 
+        # Index the mapping once by slot and by match, instead of scanning it for every slot
+        slot_vars = {}
+        home_ids = {}
+        for var_id, info in variable_mapping["to_var"].items():
+            if info[0] == "period":
+                slot_vars.setdefault((info[2], info[3]), []).append((var_id, info[1]))
+            elif info[0] == "home":
+                home_ids[info[1:]] = var_id
+
         for w_idx, w in enumerate(Weeks):
             for p_idx, p in enumerate(Periods):
-                teams_in_period = []
-                for var_id, info in variable_mapping["to_var"].items():
-                    if info[0] == "period" and info[2] == w and info[3] == p:
-                        if assignments.get(var_id, False):
-                            teams_in_period.append(info[1])
+                teams_in_period = [i for var_id, i in slot_vars.get((w, p), ()) if assignments.get(var_id, False)]
                 if len(teams_in_period) != 2:
                     continue
                 i, j = teams_in_period
 
                 # Determine the home team
-                home_id = None
-                for var_id, info in variable_mapping["to_var"].items():
-                    if info[0] == "home" and info[1] == i and info[2] == j and info[3] == w:
-                        home_id = var_id
-                        break
+                home_id = home_ids.get((i, j, w))
 
                 if home_id and assignments.get(home_id, False):
                     home_team, away_team = i + 1, j + 1
@@ -55,7 +55,7 @@ def at_least_k(bool_vars, k, name=None):
     return PbGe([(var, 1) for var in bool_vars], k)
 
 def exactly_k(bool_vars, k, name=None):
-    return And(at_most_k(bool_vars, k), at_least_k(bool_vars, k))
+    return PbEq([(var, 1) for var in bool_vars], k)
 
 
 # ----------------
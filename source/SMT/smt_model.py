@@ -82,7 +82,20 @@ def run_model(results_dict, n, solver, sb=False, opt=False):
     return results_dict
 
 
-def run_single_instance(n, solver, use_sb=False, use_optimization=False):
+def save_results(n, results_dict):
+    """
+    Writes the results of the given number of teams to the SMT results directory.
+
+    Params:
+        n: Number of teams (instances)
+        results_dict: Dictionary with the results of the configurations
+    """
+
+    os.makedirs(DEFAULT_SMT_OUTPUT_DIR, exist_ok=True)
+    utils.write_solution(DEFAULT_SMT_OUTPUT_DIR, n, results_dict)
+
+
+def run_single_instance(n, solver, use_sb=False, use_optimization=False, save=True):
     """
     Runs a single instance of the SMT model with the given parameters.
 
@@ -91,19 +104,22 @@ def run_single_instance(n, solver, use_sb=False, use_optimization=False):
         solver: The solver to use ("z3")
         use_sb: Whether to use symmetry breaking
         use_optimization: Whether to use optimization techniques
+        save: Whether to write the results to the model's results file
+    Returns:
+        results_dict: Dictionary with the results of the configuration
     """
 
     if solver is None:
         solver = 'z3'
 
-    output_dir = DEFAULT_SMT_OUTPUT_DIR  
-    os.makedirs(output_dir, exist_ok=True)
-
     results_dict = {}
 
     results_dict = run_model(results_dict, n, solver, use_sb, use_optimization)
 
-    utils.write_solution(output_dir, n, results_dict)
+    if save:
+        save_results(n, results_dict)
+
+    return results_dict
 
 
 def run_all():
@@ -72,19 +72,25 @@ def parse_solution(result):
     # schedule_periods[period][week] = [home, away]
     schedule_periods = [[None for _ in Weeks] for _ in Periods]
 
+    # One evaluation per team and week places every team in its period,
+    # then a single home variable per match tells which team plays at home
     for w in Weeks:
+        slots = [[] for _ in Periods]
         for i in Teams:
-            for j in Teams:
-                if i == j:
-                    continue
-
-                # Check if i plays at home vs j in week w
-                if model.evaluate(home[i][j][w], model_completion=True):
-                    period_val = model.evaluate(per[i][w]).as_long()
-
-                    # Place the match [home, away] in the right period and week
-                    if schedule_periods[period_val][w] is None:
-                        schedule_periods[period_val][w] = [i + 1, j + 1]  # +1 for 1-based teams
+            period_val = model.evaluate(per[i][w], model_completion=True).as_long()
+            if 0 <= period_val < len(slots):
+                slots[period_val].append(i)
+
+        for period_val, teams in enumerate(slots):
+            if len(teams) != 2:
+                continue
+            i, j = teams
+
+            # Place the match [home, away] in the right period and week
+            if is_true(model.evaluate(home[i][j][w], model_completion=True)):
+                schedule_periods[period_val][w] = [i + 1, j + 1]  # +1 for 1-based teams
+            elif is_true(model.evaluate(home[j][i][w], model_completion=True)):
+                schedule_periods[period_val][w] = [j + 1, i + 1]
 
     return schedule_periods
 